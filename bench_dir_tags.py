@@ -0,0 +1,120 @@
+import argparse
+import random
+import re
+import time
+
+from lfs_schema import dir_level_tags
+
+
+class MiniSeriesIndex:
+    """
+    A small in-memory stand-in for InfluxDB's series index.
+
+    Like TSI it keeps a posting list (series ids) per tag key/value pair. An
+    exact tag match is a posting-list lookup and intersection; a regex match has
+    to test every value of the tag key first, which is what makes
+    `directory_path =~ /.../` expensive once every directory is its own value.
+    Each series only keeps the running sum of its size field.
+    """
+
+    def __init__(self):
+        self.series = {}
+        self.series_tags = []
+        self.sums = []
+        self.postings = {}
+
+    def write(self, tags, size):
+        key = tuple(sorted(tags.items()))
+        sid = self.series.get(key)
+        if sid is None:
+            sid = self.series[key] = len(self.series_tags)
+            self.series_tags.append(tags)
+            self.sums.append(0)
+            for pair in tags.items():
+                self.postings.setdefault(pair, set()).add(sid)
+        self.sums[sid] += size
+
+    def _group(self, ids, group_by):
+        result = {}
+        for sid in ids:
+            group = self.series_tags[sid].get(group_by, '')
+            result[group] = result.get(group, 0) + self.sums[sid]
+        return result
+
+    def query_exact(self, where, group_by):
+        """SELECT SUM(size) ... WHERE k1 = 'v1' AND k2 = 'v2' ... GROUP BY group_by"""
+        lists = sorted((self.postings.get(pair, set()) for pair in where.items()), key=len)
+        ids = set.intersection(*lists) if lists else set(range(len(self.sums)))
+        return self._group(ids, group_by)
+
+    def query_regex(self, key, pattern, group_by):
+        """SELECT SUM(size) ... WHERE key =~ /pattern/ GROUP BY group_by"""
+        regex = re.compile(pattern)
+        ids = set()
+        for (k, value), posting in self.postings.items():
+            if k == key and regex.search(value):
+                ids |= posting
+        return self._group(ids, group_by)
+
+
+def synthetic_paths(count, seed=1):
+    rng = random.Random(seed)
+    apps = [f"App {i}" for i in range(200)]
+    subdirs = [f"module_{i}" for i in range(50)]
+    for i in range(count):
+        top = rng.choice(["Program Files", "Program Files (x86)", "Users", "Windows"])
+        depth = rng.randint(0, 3)
+        parts = ["mnt", "c", top, rng.choice(apps)] + [rng.choice(subdirs) for _ in range(depth)]
+        yield "/" + "/".join(parts) + f"/file_{i}.dat", rng.randint(0, 1 << 20)
+
+
+def time_query(func, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regex directory_path queries vs dir_lN exact tag matches")
+    parser.add_argument("--files", type=int, default=200000)
+    parser.add_argument("--levels", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    legacy = MiniSeriesIndex()
+    tagged = MiniSeriesIndex()
+    for path, size in synthetic_paths(args.files):
+        directory = path.rsplit('/', 1)[0] + '/'
+        legacy.write({'directory_path': directory}, size)
+        tagged.write(dir_level_tags(path, args.levels), size)
+    print(f"{args.files} files: {len(legacy.sums)} series with directory_path, "
+          f"{len(tagged.sums)} with dir_l1..dir_l{args.levels}")
+
+    # Original influx_dir_size.sql query: every directory, regex over all directory_path values
+    t_regex_all, r_regex_all = time_query(
+        lambda: legacy.query_regex('directory_path', r'^(\/)?([^\/]*\/)*$', 'directory_path'), args.repeat)
+    t_exact_all, r_exact_all = time_query(
+        lambda: tagged.query_exact({}, f'dir_l{args.levels}'), args.repeat)
+    print(f"GROUP BY directory_path regex {t_regex_all * 1000:8.2f} ms   "
+          f"GROUP BY dir_l{args.levels} {t_exact_all * 1000:8.2f} ms")
+
+    # One subtree: /mnt/c/Program Files/*, grouped by the application directory
+    t_regex, r_regex = time_query(
+        lambda: legacy.query_regex('directory_path', r'^/mnt/c/Program Files/', 'directory_path'), args.repeat)
+    t_exact, r_exact = time_query(
+        lambda: tagged.query_exact({'dir_l1': 'mnt', 'dir_l2': 'c', 'dir_l3': 'Program Files'}, 'dir_l4'),
+        args.repeat)
+    print(f"Program Files subtree   regex {t_regex * 1000:8.2f} ms   exact match   {t_exact * 1000:8.2f} ms   "
+          f"({t_regex / t_exact:.0f}x)")
+
+    if sum(r_regex.values()) != sum(r_exact.values()):
+        print("WARNING: regex and exact-match subtree totals differ")
+
+
+if __name__ == "__main__":
+    main()
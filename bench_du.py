@@ -0,0 +1,54 @@
+import argparse
+import subprocess
+import tempfile
+import time
+
+from bench_scandir_walk import build_synthetic_tree
+from lfs_du import child_directories, iter_child_usage
+
+SHELL_PIPELINE = "find {path} -mindepth 1 -maxdepth 1 -type d -print0 | xargs -0 -n1 -P4 du -sh"
+
+
+def run_shell(path):
+    # The python_shell_exec.py pipeline, parsed the way it parses it
+    result = subprocess.run(SHELL_PIPELINE.format(path=path), shell=True, capture_output=True, text=True)
+    return [line.split('\t') for line in result.stdout.splitlines()]
+
+
+def du_exact(path):
+    """Allocated bytes per child from a single `du -s -B1` call, as the reference."""
+    children = child_directories(path)
+    result = subprocess.run(["du", "-s", "-B1"] + children, capture_output=True, text=True)
+    return {line.split('\t', 1)[1]: int(line.split('\t', 1)[0]) for line in result.stdout.splitlines()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="lfs_du vs. the find | xargs du -sh pipeline")
+    parser.add_argument("--path", help="Existing directory to measure (default: a synthetic tree)")
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path
+        if path is None:
+            path = tmp
+            build_synthetic_tree(tmp)
+
+        start = time.perf_counter()
+        shell = run_shell(path)
+        t_shell = time.perf_counter() - start
+
+        start = time.perf_counter()
+        native = list(iter_child_usage(path, args.workers))
+        t_native = time.perf_counter() - start
+
+        print(f"shell pipeline {len(shell):5d} dirs {t_shell:7.3f}s (sizes like {shell[0][0] if shell else '-'})")
+        print(f"lfs_du         {len(native):5d} dirs {t_native:7.3f}s")
+
+        reference = du_exact(path)
+        mismatched = [u['path'] for u in native if reference.get(u['path']) != u['allocated']]
+        print(f"allocated size differs from du -s -B1 for {len(mismatched)} of {len(native)} directories")
+
+
+if __name__ == "__main__":
+    main()
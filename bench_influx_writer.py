@@ -0,0 +1,119 @@
+import argparse
+import gzip
+import http.server
+import shutil
+import tempfile
+import threading
+import time
+
+from lfs_influx_writer import InfluxWriter
+from lfs_lineproto import LineProtocolEncoder
+
+
+class StubInfluxHandler(http.server.BaseHTTPRequestHandler):
+    """Accepts /write like InfluxDB 1.x: gunzips the body, counts lines and answers 204."""
+
+    protocol_version = 'HTTP/1.1'  # keep-alive
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with server.lock:
+            server.requests += 1
+            fail = server.requests <= server.fail_first
+        if fail:
+            self.send_response(503)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = gzip.decompress(body)
+        with server.lock:
+            server.lines += body.count(b'\n')
+            server.bodies.append(body)
+            server.connections.add(self.client_address)
+        self.send_response(204)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(fail_first=0):
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), StubInfluxHandler)
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.lines = 0
+    server.fail_first = fail_first
+    server.connections = set()
+    server.bodies = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def make_lines(count):
+    encoder = LineProtocolEncoder()
+    encoder.add_columns("filesystem_stat",
+                        {'type': ["regular file"] * count, 'user': ["root"] * count},
+                        {'size': list(range(count)),
+                         'file': [f"/mnt/c/Program Files/App/file_{i}.dll" for i in range(count)]},
+                        [1700000000000000000 + i for i in range(count)])
+    return encoder.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise InfluxWriter against a local stub /write server")
+    parser.add_argument("--points", type=int, default=200000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--fail-first", type=int, default=2,
+                        help="Answer the first N requests with 503 to exercise retries")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.fail_first)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    text = make_lines(args.points)
+    chunks = text.splitlines(keepends=True)
+
+    with InfluxWriter(url, database="exampleDB", batch_size=args.batch_size, backoff=0.05) as writer:
+        start = time.perf_counter()
+        for i in range(0, len(chunks), 1000):
+            writer.write(''.join(chunks[i:i + 1000]))
+    elapsed = time.perf_counter() - start
+    print(writer.format_report())
+    print(f"stub received {server.lines} lines in {server.requests} requests over "
+          f"{len(server.connections)} connection(s); {args.points / elapsed:.0f} points/s end to end")
+
+    # Unreachable server: every batch must end up in the spool, then replay once it is back
+    spool = tempfile.mkdtemp(prefix="influx_spool_")
+    try:
+        dead = InfluxWriter("http://127.0.0.1:9", batch_size=args.batch_size, max_retries=1,
+                            backoff=0.01, spool_dir=spool, timeout=1)
+        dead.write(''.join(chunks[:args.batch_size * 2]))
+        dead.close()
+        before = server.lines
+        replay = InfluxWriter(url, spool_dir=spool)
+        delivered = replay.replay_spool()
+        replay.close()
+        print(f"spooled {dead.spooled} batches while unreachable, replayed {delivered} "
+              f"({server.lines - before} lines)")
+    finally:
+        shutil.rmtree(spool)
+
+    # An undecodable file name arrives from scandir as surrogate escapes and must go out as its original bytes
+    try:
+        encoder = LineProtocolEncoder()
+        encoder.add("filesystem_stat", {'type': "regular file"}, {'file': "/tmp/caf\udce9.txt", 'size': 1}, 1)
+        with InfluxWriter(url, database="exampleDB") as writer:
+            encoder.write_to(writer)
+        received = server.bodies[-1]
+        ok = b'file="/tmp/caf\xe9.txt"' in received
+        print(f"surrogate-escaped path: {'delivered as raw bytes' if ok else 'MANGLED: ' + repr(received)}")
+    finally:
+        server.shutdown()
+    if not ok:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import time
+
+from lfs_lineproto import LineProtocolEncoder, check_conformance
+
+USERS = ["root", "anbu992003", "svc_backup", "nobody"]
+TYPES = ["regular file", "directory", "symbolic link"]
+EXTENSIONS = ["txt", "dll", "exe", "json", "py", ""]
+
+
+def make_columns(rows):
+    return {
+        'path': [f"/mnt/c/Program Files/App {i % 97}/sub,dir/file_{i}.dat" for i in range(rows)],
+        'type': [TYPES[i % len(TYPES)] for i in range(rows)],
+        'user': [USERS[i % len(USERS)] for i in range(rows)],
+        'ext': [EXTENSIONS[i % len(EXTENSIONS)] for i in range(rows)],
+        'size': [i * 37 for i in range(rows)],
+        'mtime': [1700000000 + i for i in range(rows)],
+        'ts': [1700000000000000000 + i for i in range(rows)],
+    }
+
+
+def bench_fstring(cols):
+    # The ad hoc style the scripts used before (no escaping beyond spaces)
+    out = []
+    for path, type_, user, ext, size, mtime, ts in zip(cols['path'], cols['type'], cols['user'], cols['ext'],
+                                                       cols['size'], cols['mtime'], cols['ts']):
+        out.append(f'filesystem_stat,type={type_.replace(" ", chr(92) + " ")},user={user},filetype={ext} '
+                   f'size={size}i,file="{path}",modified_time={mtime}i {ts}\n')
+    return ''.join(out)
+
+
+def bench_records(cols):
+    encoder = LineProtocolEncoder()
+    encoder.add_batch("filesystem_stat", (
+        ({'type': type_, 'user': user, 'filetype': ext},
+         {'size': size, 'file': path, 'modified_time': mtime}, ts)
+        for path, type_, user, ext, size, mtime, ts in zip(cols['path'], cols['type'], cols['user'], cols['ext'],
+                                                           cols['size'], cols['mtime'], cols['ts'])))
+    return encoder.getvalue()
+
+
+def bench_columns(cols):
+    encoder = LineProtocolEncoder()
+    encoder.add_columns("filesystem_stat",
+                        {'type': cols['type'], 'user': cols['user'], 'filetype': cols['ext']},
+                        {'size': cols['size'], 'file': cols['path'], 'modified_time': cols['mtime']},
+                        cols['ts'])
+    return encoder.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Line protocol encoder throughput in lines/sec")
+    parser.add_argument("--rows", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    failures = check_conformance()
+    if failures:
+        print(f"{len(failures)} conformance failures, run lfs_lineproto.py for details")
+
+    cols = make_columns(args.rows)
+    for label, func in (("f-string (unescaped)", bench_fstring),
+                        ("encoder add_batch", bench_records),
+                        ("encoder add_columns", bench_columns)):
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            text = func(cols)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{label:<22} {args.rows / best:12.0f} lines/s  {len(text) / best / 1e6:8.1f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
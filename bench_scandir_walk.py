@@ -0,0 +1,117 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from lfs_fileinfo import get_file_info, iter_file_stats, stat_to_file_info, walk_directory
+
+
+def build_synthetic_tree(root, depth=3, dirs_per_level=8, files_per_dir=20):
+    """
+    Creates a synthetic directory tree of empty-ish files for benchmarking.
+
+    Every directory also gets a symlink to one of its files, and root gets a
+    dangling symlink and a symlink to a directory, so the walkers' symlink
+    handling is part of what is compared.
+
+    Args:
+        root (str): Directory to create the tree under.
+        depth (int): Number of directory levels below root.
+        dirs_per_level (int): Subdirectories created in each directory.
+        files_per_dir (int): Files created in each directory.
+
+    Returns:
+        int: The number of files (and file symlinks) created.
+    """
+    count = 0
+    level = [root]
+    for current_depth in range(depth + 1):
+        next_level = []
+        for d in level:
+            for i in range(files_per_dir):
+                with open(os.path.join(d, f"file_{i}.dat"), "w") as f:
+                    f.write("x" * i)
+                count += 1
+            if files_per_dir:
+                os.symlink(f"file_{files_per_dir - 1}.dat", os.path.join(d, "link.dat"))
+                count += 1
+            if current_depth < depth:
+                for i in range(dirs_per_level):
+                    sub = os.path.join(d, f"dir_{i}")
+                    os.mkdir(sub)
+                    next_level.append(sub)
+        level = next_level
+    os.symlink("missing.dat", os.path.join(root, "dangling.dat"))
+    if dirs_per_level and depth:
+        os.symlink("dir_0", os.path.join(root, "dir_link"))
+    return count
+
+
+def run_os_walk(directory):
+    total = 0
+    files = 0
+    for path in walk_directory(directory):
+        size, owner, group, permissions = get_file_info(path)
+        if size is not None:
+            total += size
+            files += 1
+    return files, total
+
+
+def run_scandir(directory):
+    total = 0
+    files = 0
+    for path, st in iter_file_stats(directory):
+        size, owner, group, permissions = stat_to_file_info(st)
+        total += size
+        files += 1
+    return files, total
+
+
+def time_it(func, directory, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(directory)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare os.walk + os.stat against scandir_walk")
+    parser.add_argument("--path", help="Existing tree to scan instead of a synthetic one")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--dirs", type=int, default=8)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp = None
+    directory = args.path
+    if directory is None:
+        tmp = tempfile.mkdtemp(prefix="bench_scandir_")
+        created = build_synthetic_tree(tmp, args.depth, args.dirs, args.files)
+        print(f"Synthetic tree: {created} files under {tmp}")
+        directory = tmp
+
+    try:
+        walk_time, walk_result = time_it(run_os_walk, directory, args.repeat)
+        scan_time, scan_result = time_it(run_scandir, directory, args.repeat)
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp)
+
+    print(f"os.walk + get_file_info: {walk_result[0]} files, {walk_result[1]} bytes in {walk_time:.3f}s "
+          f"({walk_result[0] / walk_time:.0f} files/s)")
+    print(f"scandir_walk:            {scan_result[0]} files, {scan_result[1]} bytes in {scan_time:.3f}s "
+          f"({scan_result[0] / scan_time:.0f} files/s)")
+    print(f"Speedup: {walk_time / scan_time:.2f}x")
+    if walk_result != scan_result:
+        print("WARNING: the two walkers disagree on file count or total size")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from bench_scandir_walk import build_synthetic_tree
+from lfs_owner_cache import OwnerResolver
+from lfs_stat_collector import collect, format_compat
+
+# Timings recorded in bash_file_stat_process.sh against /mnt/c/Program Files (WSL)
+# label, entries, seconds
+SHELL_BASELINES = [
+    ("find | xargs -n1 -P4 stat", 61197, 94.237),
+    ("find | xargs -n1 -P4 ls -l", 61197, 199.797),
+    ("find -type f | xargs -P0 stat", 53609, 64.707),
+    ("filestat_master.sh (stat | awk per file)", 61197, 190.272),
+]
+
+# Per-file fork pipeline from filestat_master.sh, pointed at the benchmark tree
+SHELL_PIPELINE = r'''find "$1" -print0 | xargs -0 -P4 -I{} sh -c 'stat -c "%s:%n:%a:%U:%G:%Y:%X:%F" "{}" | awk -F: -v timestamp=$(date +%s%N) '\''{ print "filesystem_stat,type=\"" $8 "\",permissions=\"" $3 "\" size=" $1 " " timestamp }'\'' ' '''
+
+
+def run_collector(directory):
+    resolver = OwnerResolver()
+    entries = 0
+    with open(os.devnull, "w") as out:
+        for rec in collect(directory, resolver):
+            out.write(format_compat(rec, time.time_ns()))
+            entries += 1
+    return entries
+
+
+def run_shell(directory):
+    result = subprocess.run(["bash", "-c", SHELL_PIPELINE, "bench", directory],
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    return result.stdout.count("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regression benchmark for the fork-free stat collector")
+    parser.add_argument("--path", help="Existing tree to scan instead of a synthetic one")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--dirs", type=int, default=6)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--shell", action="store_true",
+                        help="Also time the per-file stat | awk pipeline on the same tree and fail when the "
+                             "collector is not --min-speedup times faster")
+    parser.add_argument("--min-speedup", type=float, default=10.0,
+                        help="Required collector/shell speedup on the same tree with --shell")
+    args = parser.parse_args()
+
+    tmp = None
+    directory = args.path
+    if directory is None:
+        tmp = tempfile.mkdtemp(prefix="bench_collector_")
+        build_synthetic_tree(tmp, args.depth, args.dirs, args.files)
+        directory = tmp
+
+    shell_elapsed = None
+    try:
+        start = time.perf_counter()
+        entries = run_collector(directory)
+        elapsed = time.perf_counter() - start
+        rate = entries / elapsed
+        print(f"lfs_stat_collector: {entries} entries in {elapsed:.3f}s ({rate:.0f} entries/s)")
+
+        if args.shell:
+            start = time.perf_counter()
+            shell_entries = run_shell(directory)
+            shell_elapsed = time.perf_counter() - start
+            print(f"stat | awk per file: {shell_entries} entries in {shell_elapsed:.3f}s "
+                  f"({shell_entries / shell_elapsed:.0f} entries/s, collector is "
+                  f"{shell_elapsed / elapsed:.1f}x faster)")
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp)
+
+    # Recorded on another machine and filesystem, so for reference only
+    print("Recorded shell baselines (WSL /mnt/c, not comparable to this tree):")
+    for label, count, seconds in SHELL_BASELINES:
+        print(f"  {label:<42} {count / seconds:8.0f} entries/s")
+
+    # The gate compares both approaches on the same tree in the same run
+    if shell_elapsed is not None:
+        speedup = shell_elapsed / elapsed
+        if speedup < args.min_speedup:
+            print(f"REGRESSION: the collector is only {speedup:.1f}x faster than the shell pipeline on this "
+                  f"tree (need {args.min_speedup:.1f}x)")
+            sys.exit(1)
+    else:
+        print("No regression gate without --shell")
+
+
+if __name__ == "__main__":
+    main()
@@ -91,9 +91,9 @@ ssh user@remote-host 'bash -s' < commands.txt
 
 
 
-import os
 import subprocess
-from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from lfs_concurrency import AdaptiveStatPool, HillClimbingController
 
 def stat_directory(directory):
     try:
@@ -104,10 +104,11 @@ def stat_directory(directory):
 
 def main():
     directories = subprocess.check_output(['find', '/path/to/search', '-type', 'd']).decode('utf-8').splitlines()
-    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
-        futures = [executor.submit(stat_directory, d) for d in directories]
-        for future in as_completed(futures):
-            print(future.result())
+    # cpu_count() threads is too many for a local disk and too few for /mnt/c or Lustre,
+    # so the pool is sized from the measured directories/sec instead
+    pool = AdaptiveStatPool(HillClimbingController(), task=lambda d: ([stat_directory(d)], [], []))
+    for outputs, _ in pool.run(directories):
+        print(outputs[0])
 
 if __name__ == "__main__":
     main()
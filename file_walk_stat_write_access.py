@@ -35,31 +35,17 @@ size i
 
 >>>>>>>>>>>>>>>>>>>> Error handling folder walk
 
-import os
+import sys
+from lfs_perm_audit import PermissionAudit, json_lines_reporter
 
+# One scandir per directory and no file opens: readability comes from the mode
+# bits, listing failures from the walk's own PermissionError. Each problem is
+# written to stdout as one JSON line (path, kind, errno, mode, uid, gid).
 def safe_os_walk(directory_path):
-    for dirpath, dirnames, filenames in os.walk(directory_path):
-        try:
-            # Try accessing the directory contents
-            for dirname in dirnames:
-                subdir_path = os.path.join(dirpath, dirname)
-                try:
-                    os.listdir(subdir_path)
-                except PermissionError:
-                    print(f"Permission denied: {subdir_path}")
-                    dirnames.remove(dirname)  # Remove this directory from the list to prevent os.walk from recursing into it
-
-            # Process files
-            for filename in filenames:
-                file_path = os.path.join(dirpath, filename)
-                try:
-                    with open(file_path, 'r'):
-                        pass  # Just attempt to open the file to check permissions
-                except PermissionError:
-                    print(f"Permission denied: {file_path}")
-
-        except PermissionError:
-            print(f"Permission denied: {dirpath}")
+    audit = PermissionAudit(report=json_lines_reporter(sys.stdout))
+    for path, st in audit.run(directory_path):
+        pass  # Process the entry here
+    print(audit.format_report(), file=sys.stderr)
 
 # Specify the directory to walk
 directory_path = "/path/to/directory"
@@ -70,14 +56,17 @@ safe_os_walk(directory_path)
 >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>User write access
 
 import os
-import pwd
+from lfs_owner_cache import OwnerResolver
+
+# Shared across calls so repeated checks do not hit NSS again for the same user
+owner_resolver = OwnerResolver()
 
-def user_has_write_access(user_id, path):
-    try:
-        # Get the user name from user ID
-        user_name = pwd.getpwuid(user_id).pw_name
-    except KeyError:
+def user_has_write_access(user_id, path, resolver=owner_resolver):
+    # Get the user name and login group from the cached resolver
+    user_gid = resolver.primary_gid(user_id)
+    if user_gid is None:
         return f"User ID {user_id} not found."
+    user_name = resolver.user(user_id)
 
     # Check if the path exists
     if not os.path.exists(path):
@@ -88,9 +77,7 @@ def user_has_write_access(user_id, path):
     file_mode = file_stat.st_mode
 
     # Get the user's UID and GID
-    user_info = pwd.getpwnam(user_name)
-    user_uid = user_info.pw_uid
-    user_gid = user_info.pw_gid
+    user_uid = user_id
 
     # Check if the user has write permission
     if (
@@ -108,14 +95,17 @@ path = '/path/to/file_or_directory'  # Replace with the file or directory path
 result = user_has_write_access(user_id, path)
 print(result)
 import os
-import pwd
+from lfs_owner_cache import OwnerResolver
+
+# Shared across calls so repeated checks do not hit NSS again for the same user
+owner_resolver = OwnerResolver()
 
-def user_has_write_access(user_id, path):
-    try:
-        # Get the user name from user ID
-        user_name = pwd.getpwuid(user_id).pw_name
-    except KeyError:
+def user_has_write_access(user_id, path, resolver=owner_resolver):
+    # Get the user name and login group from the cached resolver
+    user_gid = resolver.primary_gid(user_id)
+    if user_gid is None:
         return f"User ID {user_id} not found."
+    user_name = resolver.user(user_id)
 
     # Check if the path exists
     if not os.path.exists(path):
@@ -126,9 +116,7 @@ def user_has_write_access(user_id, path):
     file_mode = file_stat.st_mode
 
     # Get the user's UID and GID
-    user_info = pwd.getpwnam(user_name)
-    user_uid = user_info.pw_uid
-    user_gid = user_info.pw_gid
+    user_uid = user_id
 
     # Check if the user has write permission
     if (
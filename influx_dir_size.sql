@@ -21,4 +21,38 @@ Additional Considerations:
 Performance: For large datasets, consider using continuous queries or downsampling to optimize performance.
 Data Retention Policy: Ensure your data retention policy covers the desired time range.
 Data Modeling: If you're storing a large number of files, consider optimizing your data model by using tags for common directory prefixes to reduce cardinality.
-Regular Expression Refinement: Adjust the regular expression in the WHERE clause based on your specific directory structure needs (e.g., to exclude certain directories).
\ No newline at end of file
+Regular Expression Refinement: Adjust the regular expression in the WHERE clause based on your specific directory structure needs (e.g., to exclude certain directories).
+
+
+Exact-match rewrites (collector run with --dir-levels N)
+===========================================================
+lfs_stat_collector.py --dir-levels 4 tags every point with the components of its parent directory
+(dir_l1=mnt, dir_l2=c, dir_l3=Program Files, dir_l4=7-Zip). The series index can then answer the
+filters from posting lists instead of running the regex over every directory_path value.
+
+-- Size per directory, one level below /mnt/c/Program Files, last hour
+SELECT SUM(size)
+FROM filesystem_stat
+WHERE time >= now() - 1h
+  AND dir_l1 = 'mnt' AND dir_l2 = 'c' AND dir_l3 = 'Program Files'
+GROUP BY dir_l4
+
+-- Same, all time
+SELECT SUM(size)
+FROM filesystem_stat
+WHERE dir_l1 = 'mnt' AND dir_l2 = 'c' AND dir_l3 = 'Program Files'
+GROUP BY dir_l4
+
+-- Size per directory prefix down to level 4 (replaces GROUP BY directory_path)
+SELECT SUM(size)
+FROM filesystem_stat
+WHERE time >= now() - 1h AND "type" = 'regular file'
+GROUP BY dir_l1, dir_l2, dir_l3, dir_l4
+
+-- Pre-aggregated at scan time (--rollups --dir-levels 4): a few points per directory instead of one per file
+SELECT LAST(size)
+FROM filesystem_rollup
+WHERE time >= now() - 1h AND "by" = 'directory' AND dir_l3 = 'Program Files'
+GROUP BY dir_l4
+
+bench_dir_tags.py compares the regex and exact-match forms on an in-memory series index stand-in.
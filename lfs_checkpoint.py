@@ -0,0 +1,218 @@
+import argparse
+import json
+import os
+import stat
+import sys
+import time
+
+from lfs_lineproto import LineProtocolEncoder
+from lfs_owner_cache import OwnerResolver
+from lfs_stat_collector import StatRecord, add_record
+
+CHECKPOINT_VERSION = 1
+
+
+def load_checkpoint(path):
+    """Returns the saved checkpoint, or None when there is none."""
+    try:
+        with open(path, encoding='utf-8', errors='surrogateescape') as f:
+            checkpoint = json.load(f)
+    except FileNotFoundError:
+        return None
+    if checkpoint.get('version') != CHECKPOINT_VERSION:
+        raise ValueError(f"{path}: unsupported checkpoint version {checkpoint.get('version')}")
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    """Writes the checkpoint next to its final name, syncs it and renames it into place."""
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8', errors='surrogateescape') as f:
+        json.dump(checkpoint, f, separators=(',', ':'))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class CheckpointedScan:
+    """
+    A filesystem_stat scan that can be interrupted and resumed without duplicate points.
+
+    The unit of work is one directory: all of its entries are written before
+    the next directory is read, so between two directories the scan's state
+    is just the stack of directories still to read (the frontier) and the
+    number of bytes written so far. Every `interval` seconds that state is
+    saved, after the output has been flushed and fsync'ed up to that offset.
+    A restart truncates the output back to the saved offset, dropping the
+    points of directories that were in flight, and continues from the saved
+    frontier. Completed directories are only counted: everything that is not
+    on the frontier or below it is done, so there is no need to store them.
+    With a limiter (lfs_rate_limit.TokenBucket) every directory read and stat
+    is taken from its budget.
+    """
+
+    def __init__(self, root, output, checkpoint_path, interval=30.0, schema='default', resolver=None,
+                 onerror=None, prefix_depth=3, dir_levels=0, limiter=None):
+        self.root = root
+        self.output = output
+        self.checkpoint_path = checkpoint_path
+        self.interval = interval
+        self.schema = schema
+        self.prefix_depth = prefix_depth
+        self.dir_levels = dir_levels
+        self.limiter = limiter
+        self.resolver = resolver or OwnerResolver()
+        self.onerror = onerror
+        self.uid = os.geteuid()
+        self.gids = set(os.getgroups()) | {os.getegid()}
+        self.pending = None
+        self.completed = 0
+        self.entries = 0
+        self.resumed = False
+        self.checkpoints = 0
+        self.checkpoint_time = 0.0
+        self.elapsed = 0.0
+
+    def _report(self, e):
+        if self.onerror is not None:
+            self.onerror(e)
+
+    def _open(self):
+        """Opens the output, either fresh or truncated back to the checkpointed offset."""
+        checkpoint = load_checkpoint(self.checkpoint_path)
+        if checkpoint is not None:
+            if checkpoint['root'] != self.root or checkpoint['output'] != os.path.abspath(self.output):
+                raise ValueError(f"{self.checkpoint_path} belongs to a scan of {checkpoint['root']} "
+                                 f"into {checkpoint['output']}")
+            out = open(self.output, 'r+b')
+            out.seek(0, os.SEEK_END)
+            if out.tell() < checkpoint['offset']:
+                out.close()
+                raise ValueError(f"{self.output} is shorter than the checkpointed offset {checkpoint['offset']}")
+            out.truncate(checkpoint['offset'])
+            out.seek(checkpoint['offset'])
+            self.pending = checkpoint['pending']
+            self.completed = checkpoint['completed']
+            self.entries = checkpoint['entries']
+            self.resumed = True
+            return out
+        out = open(self.output, 'wb')
+        self.pending = [self.root]
+        return out
+
+    def _checkpoint(self, out):
+        start = time.perf_counter()
+        out.flush()
+        os.fsync(out.fileno())
+        save_checkpoint(self.checkpoint_path, {
+            'version': CHECKPOINT_VERSION,
+            'root': self.root,
+            'output': os.path.abspath(self.output),
+            'offset': out.tell(),
+            'pending': self.pending,
+            'completed': self.completed,
+            'entries': self.entries,
+            'time': time.time(),
+        })
+        self.checkpoints += 1
+        self.checkpoint_time += time.perf_counter() - start
+
+    def _emit(self, encoder, path, st):
+        add_record(encoder, StatRecord(path, st, self.resolver, self.uid, self.gids), time.time_ns(), self.schema,
+                   self.prefix_depth, self.dir_levels)
+        self.entries += 1
+
+    def run(self):
+        """
+        Scans (or resumes scanning) root into the output file.
+
+        Returns:
+            dict: entries, completed directories, whether it resumed, checkpoints
+                written and the share of the run they took.
+        """
+        start = time.perf_counter()
+        out = self._open()
+        encoder = LineProtocolEncoder()
+        try:
+            if not self.resumed:
+                try:
+                    self._emit(encoder, self.root, os.lstat(self.root))
+                except OSError as e:
+                    self._report(e)
+                    self.pending = []
+            last = time.monotonic()
+            pending = self.pending
+            limiter = self.limiter
+            while pending:
+                directory = pending[-1]
+                subdirs = []
+                try:
+                    if limiter is not None:
+                        limiter.acquire()
+                    with os.scandir(directory) as it:
+                        for entry in it:
+                            try:
+                                st = entry.stat(follow_symlinks=False) if limiter is None else \
+                                    limiter.timed_stat(entry)
+                            except OSError as e:
+                                self._report(e)
+                                continue
+                            self._emit(encoder, entry.path, st)
+                            if stat.S_ISDIR(st.st_mode):
+                                subdirs.append(entry.path)
+                except OSError as e:
+                    self._report(e)
+                # The directory leaves the frontier only once its points are in the buffer
+                pending.pop()
+                pending.extend(subdirs)
+                self.completed += 1
+                if len(encoder) >= 5000:
+                    out.write(encoder.getbytes())
+                    encoder.clear()
+                if self.interval and time.monotonic() - last >= self.interval:
+                    out.write(encoder.getbytes())
+                    encoder.clear()
+                    self._checkpoint(out)
+                    last = time.monotonic()
+            out.write(encoder.getbytes())
+            out.flush()
+        finally:
+            out.close()
+        # Finished: nothing left to resume
+        if os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        self.elapsed = time.perf_counter() - start
+        return {
+            'entries': self.entries,
+            'completed': self.completed,
+            'resumed': self.resumed,
+            'checkpoints': self.checkpoints,
+            'checkpoint_time': self.checkpoint_time,
+            'overhead': self.checkpoint_time / self.elapsed if self.elapsed else 0.0,
+        }
+
+
+def format_summary(summary):
+    return (f"{summary['entries']} entries, {summary['completed']} directories"
+            f"{' (resumed)' if summary['resumed'] else ''}; {summary['checkpoints']} checkpoints took "
+            f"{summary['checkpoint_time']:.3f}s ({summary['overhead']:.2%} of the run)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="filesystem_stat scan with checkpoint/resume")
+    parser.add_argument("path", help="Directory to scan")
+    parser.add_argument("output", help="Line protocol output file")
+    parser.add_argument("--checkpoint", help="Checkpoint file (default: OUTPUT.checkpoint)")
+    parser.add_argument("--interval", type=float, default=30.0, help="Seconds between checkpoints (0 disables)")
+    args = parser.parse_args()
+
+    def report(e):
+        print(f"{e.filename}: {e.strerror}", file=sys.stderr)
+
+    scan = CheckpointedScan(args.path, args.output, args.checkpoint or args.output + '.checkpoint',
+                            args.interval, onerror=report)
+    print(format_summary(scan.run()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
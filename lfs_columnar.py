@@ -0,0 +1,205 @@
+import argparse
+import array
+import os
+import sys
+import time
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # only needed when a columnar snapshot is actually written or read
+    pa = pq = None
+
+from lfs_owner_cache import OwnerResolver
+from lfs_scandir_walk import scandir_walk
+
+# (column, array typecode) of the fixed-width columns; owner, group and
+# extension are dictionary-encoded strings, path is a plain string column
+NUMERIC_COLUMNS = (
+    ('size', 'q'),
+    ('mtime', 'q'),
+    ('atime', 'q'),
+    ('uid', 'I'),
+    ('gid', 'I'),
+    ('mode', 'I'),
+    ('dev', 'Q'),
+    ('ino', 'Q'),
+)
+DICTIONARY_COLUMNS = ('owner', 'group', 'extension')
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("columnar snapshots need pyarrow (pip install pyarrow)")
+
+
+def snapshot_schema():
+    """The Arrow schema of a scan snapshot; times are nanoseconds since the epoch."""
+    _require_pyarrow()
+    types = {'q': pa.int64(), 'I': pa.uint32(), 'Q': pa.uint64()}
+    return pa.schema([('path', pa.string())]
+                     + [(name, types[code]) for name, code in NUMERIC_COLUMNS]
+                     + [(name, pa.dictionary(pa.int32(), pa.string())) for name in DICTIONARY_COLUMNS])
+
+
+class _Dictionary:
+    """Maps strings to stable int32 codes; the value list only ever grows, so batches share it."""
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+        self.indices = array.array('i')
+
+    def append(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        self.indices.append(code)
+
+
+class ColumnarSnapshotWriter:
+    """
+    Writes scan records as typed columns, one row group at a time.
+
+    Records are appended to array.array buffers (int64 size/mtime/atime,
+    uint32 uid/gid/mode, uint64 dev/ino) and dictionary codes for owner, group
+    and extension, so a buffered record costs a few dozen bytes instead of a
+    dict of Python objects. Every row_group_size records the buffers are
+    handed to Arrow without copying and written out.
+
+    A path ending in .parquet gives a compressed Parquet file; anything else an
+    Arrow IPC file, which read_snapshot can memory-map without parsing.
+    """
+
+    def __init__(self, path, row_group_size=65536):
+        _require_pyarrow()
+        self.path = path
+        self.row_group_size = row_group_size
+        self.schema = snapshot_schema()
+        self.parquet = path.endswith('.parquet')
+        self.rows = 0
+        self.row_groups = 0
+        self.dictionaries = {name: _Dictionary() for name in DICTIONARY_COLUMNS}
+        self._reset()
+        if self.parquet:
+            self._writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+        else:
+            self._sink = pa.OSFile(path, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, self.schema,
+                                           options=pa.ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+
+    def _reset(self):
+        self.paths = []
+        self.columns = {name: array.array(code) for name, code in NUMERIC_COLUMNS}
+        for dictionary in self.dictionaries.values():
+            dictionary.indices = array.array('i')
+
+    def add(self, path, st, owner, group, extension):
+        """Appends one entry from its lstat result and resolved names."""
+        columns = self.columns
+        self.paths.append(path)
+        columns['size'].append(st.st_size)
+        columns['mtime'].append(st.st_mtime_ns)
+        columns['atime'].append(st.st_atime_ns)
+        columns['uid'].append(st.st_uid)
+        columns['gid'].append(st.st_gid)
+        columns['mode'].append(st.st_mode)
+        columns['dev'].append(st.st_dev)
+        columns['ino'].append(st.st_ino)
+        self.dictionaries['owner'].append(owner)
+        self.dictionaries['group'].append(group)
+        self.dictionaries['extension'].append(extension)
+        if len(self.paths) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Writes the buffered records as one row group (one record batch for Arrow files)."""
+        count = len(self.paths)
+        if not count:
+            return
+        try:
+            paths = pa.array(self.paths, type=pa.string())
+        except UnicodeEncodeError:
+            # Names that are not valid UTF-8 (surrogate-escaped by os) are stored escaped
+            paths = pa.array([p.encode('utf-8', 'surrogateescape').decode('utf-8', 'backslashreplace')
+                              for p in self.paths], type=pa.string())
+        arrays = [paths]
+        for (name, _), field in zip(NUMERIC_COLUMNS, self.schema.types[1:]):
+            # Zero-copy: the array buffer becomes the Arrow data buffer
+            arrays.append(pa.Array.from_buffers(field, count, [None, pa.py_buffer(self.columns[name])]))
+        for name in DICTIONARY_COLUMNS:
+            dictionary = self.dictionaries[name]
+            indices = pa.Array.from_buffers(pa.int32(), count, [None, pa.py_buffer(dictionary.indices)])
+            arrays.append(pa.DictionaryArray.from_arrays(indices, pa.array(dictionary.values, type=pa.string())))
+        batch = pa.record_batch(arrays, schema=self.schema)
+        if self.parquet:
+            self._writer.write_batch(batch, row_group_size=count)
+        else:
+            self._writer.write_batch(batch)
+        self.rows += count
+        self.row_groups += 1
+        self._reset()
+
+    def close(self):
+        self.flush()
+        self._writer.close()
+        if not self.parquet:
+            self._sink.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_snapshot(path, columns=None):
+    """
+    Opens a snapshot as a pyarrow.Table.
+
+    Arrow IPC files are memory-mapped, so the columns are backed by the page
+    cache rather than copied onto the heap; Parquet files are decoded.
+    """
+    _require_pyarrow()
+    if path.endswith('.parquet'):
+        return pq.read_table(path, columns=columns, memory_map=True)
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    return table.select(columns) if columns else table
+
+
+def write_scan(root, path, resolver=None, row_group_size=65536, onerror=None):
+    """
+    Walks root and writes every non-directory entry to a columnar snapshot.
+
+    Returns:
+        ColumnarSnapshotWriter: The closed writer (rows, row_groups).
+    """
+    resolver = resolver or OwnerResolver()
+    with ColumnarSnapshotWriter(path, row_group_size) as writer:
+        for entry_path, st in scandir_walk(root, onerror=onerror):
+            base = entry_path.rsplit('/', 1)[-1]
+            extension = base.rsplit('.', 1)[-1] if '.' in base[1:] else ''
+            writer.add(entry_path, st, resolver.user(st.st_uid), resolver.group(st.st_gid), extension)
+    return writer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan a tree into an Arrow or Parquet snapshot")
+    parser.add_argument("path", help="Directory to scan")
+    parser.add_argument("output", help="Snapshot file (.arrow or .parquet)")
+    parser.add_argument("--row-group-size", type=int, default=65536)
+    args = parser.parse_args()
+
+    def report(e):
+        print(f"{e.filename}: {e.strerror}", file=sys.stderr)
+
+    start = time.perf_counter()
+    writer = write_scan(args.path, args.output, row_group_size=args.row_group_size, onerror=report)
+    elapsed = time.perf_counter() - start
+    print(f"{writer.rows} records in {writer.row_groups} row groups, {os.path.getsize(args.output)} bytes, "
+          f"{elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
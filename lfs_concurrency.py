@@ -0,0 +1,329 @@
+import argparse
+import functools
+import multiprocessing
+import os
+import queue
+import stat
+import sys
+import threading
+import time
+
+from lfs_lineproto import LineProtocolEncoder
+from lfs_owner_cache import OwnerResolver
+from lfs_stat_collector import StatRecord, add_record
+
+
+class HillClimbingController:
+    """
+    Picks a worker count by measuring entries/sec and climbing towards the best one.
+
+    It starts small and, once per window, compares the throughput of the window
+    that just ended with the one before. While throughput keeps improving it
+    keeps moving in the same direction with a growing step; when it gets worse
+    it turns around with a step of one. When a change makes no measurable
+    difference it drifts down, because the cheaper setting is as good. A local
+    disk ends up with a few workers, a high-latency mount (/mnt/c, NFS, Lustre)
+    with many, without having to know which is which up front.
+    """
+
+    def __init__(self, initial=2, minimum=1, maximum=64, window=0.5, tolerance=0.05):
+        self.workers = max(minimum, min(initial, maximum))
+        self.minimum = minimum
+        self.maximum = maximum
+        self.window = window
+        self.tolerance = tolerance
+        self.direction = 1
+        self.step = 1
+        self.last_rate = None
+        self.history = []
+        self._count = 0
+        self._window_start = time.monotonic()
+        self._lock = threading.Lock()
+
+    def completed(self, n=1):
+        with self._lock:
+            self._count += n
+
+    def tick(self):
+        """
+        Ends the window if it has run long enough and moves the worker count.
+
+        Returns:
+            bool: True when the worker count changed.
+        """
+        now = time.monotonic()
+        elapsed = now - self._window_start
+        if elapsed < self.window:
+            return False
+        with self._lock:
+            rate = self._count / elapsed
+            self._count = 0
+        self._window_start = now
+        self.history.append((self.workers, rate))
+        if self.last_rate is not None:
+            if rate > self.last_rate * (1 + self.tolerance):
+                self.step = min(self.step * 2, max(1, self.maximum // 4))
+            elif rate < self.last_rate * (1 - self.tolerance):
+                self.direction = -self.direction
+                self.step = 1
+            else:
+                self.direction = -1
+                self.step = 1
+        self.last_rate = rate
+        workers = max(self.minimum, min(self.maximum, self.workers + self.direction * self.step))
+        if workers == self.workers:
+            # Pinned at a bound: probe the other way next time
+            self.direction = -self.direction
+            return False
+        self.workers = workers
+        return True
+
+    def format_report(self):
+        steps = " ".join(f"{w}:{r:.0f}" for w, r in self.history[-12:])
+        return f"concurrency: {self.workers} workers now; last windows (workers:entries/s) {steps}"
+
+
+def scan_directory(directory, limiter=None):
+    """
+    Reads one directory. Returns (records, subdirectories, errors); records are picklable tuples.
+
+    With a limiter (lfs_rate_limit.TokenBucket, which is thread-safe) the
+    directory read and every stat are taken from its budget.
+    """
+    records = []
+    subdirs = []
+    errors = []
+    try:
+        if limiter is not None:
+            limiter.acquire()
+        with os.scandir(directory) as it:
+            for entry in it:
+                try:
+                    st = entry.stat(follow_symlinks=False) if limiter is None else limiter.timed_stat(entry)
+                except OSError as e:
+                    errors.append(e)
+                    continue
+                records.append((entry.path, st.st_mode, st.st_uid, st.st_gid, st.st_size,
+                                int(st.st_atime), int(st.st_mtime)))
+                if stat.S_ISDIR(st.st_mode):
+                    subdirs.append(entry.path)
+    except OSError as e:
+        errors.append(e)
+    return records, subdirs, errors
+
+
+class AdaptiveStatPool:
+    """
+    Thread pool for the latency-bound part of a scan whose size follows a HillClimbingController.
+
+    stat and scandir spend their time waiting on the filesystem with the GIL
+    released, so threads are the right tool: waiting threads cost nothing and
+    share the queues. Up to controller.maximum threads are started; the ones
+    whose index is at or above the current target park until it rises again.
+
+    task is called with one queued item and returns (records, subitems,
+    errors) like scan_directory; subitems are queued in turn, and the length
+    of records is the work the controller measures. An OSError raised by task
+    is reported as that item's only error; any other exception is re-raised
+    by run().
+    """
+
+    def __init__(self, controller, task=scan_directory):
+        self.controller = controller
+        self.task = task
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.threads = []
+        self._stop = False
+        self._resized = threading.Condition()
+
+    def _worker(self, index):
+        while True:
+            with self._resized:
+                while not self._stop and index >= self.controller.workers:
+                    self._resized.wait()
+                if self._stop:
+                    return
+            try:
+                directory = self.tasks.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            try:
+                result = self.task(directory)
+            except OSError as e:
+                result = ([], [], [e])
+            except BaseException as e:
+                # Hand it to run(), which would otherwise wait for this task forever
+                result = e
+            else:
+                self.controller.completed(len(result[0]))
+            self.results.put(result)
+
+    def _ensure_threads(self):
+        while len(self.threads) < self.controller.workers:
+            t = threading.Thread(target=self._worker, args=(len(self.threads),), daemon=True)
+            self.threads.append(t)
+            t.start()
+        with self._resized:
+            self._resized.notify_all()
+
+    def run(self, roots):
+        """
+        Walks every root and yields (records, errors) per task as they complete.
+
+        The generator drives the controller, so the pool is resized on the
+        caller's thread between results.
+        """
+        pending = 0
+        for root in ([roots] if isinstance(roots, str) else roots):
+            self.tasks.put(root)
+            pending += 1
+        self._ensure_threads()
+        try:
+            while pending:
+                try:
+                    result = self.results.get(timeout=self.controller.window)
+                except queue.Empty:
+                    result = None
+                if isinstance(result, BaseException):
+                    raise result
+                if result is not None:
+                    records, subdirs, errors = result
+                    pending -= 1
+                    for subdir in subdirs:
+                        self.tasks.put(subdir)
+                    pending += len(subdirs)
+                    yield records, errors
+                if self.controller.tick():
+                    self._ensure_threads()
+        finally:
+            with self._resized:
+                self._stop = True
+                self._resized.notify_all()
+
+
+# Per-process state of the encoding pool
+_encoder_state = {}
+
+
+def init_encoder(uid, gids, schema, prefix_depth=3, dir_levels=0):
+    _encoder_state.update(uid=uid, gids=gids, schema=schema, prefix_depth=prefix_depth, dir_levels=dir_levels,
+                          resolver=OwnerResolver())
+
+
+def encode_records(records):
+    """Turns (path, mode, uid, gid, size, atime, mtime) tuples into filesystem_stat line protocol."""
+    state = _encoder_state
+    encoder = LineProtocolEncoder()
+    timestamp = time.time_ns()
+    for path, mode, st_uid, st_gid, size, atime, mtime in records:
+        st = os.stat_result((mode, 0, 0, 1, st_uid, st_gid, size, atime, mtime, 0))
+        add_record(encoder, StatRecord(path, st, state['resolver'], state['uid'], state['gids']),
+                   timestamp, state['schema'], state['prefix_depth'], state['dir_levels'])
+    return encoder.getvalue()
+
+
+def encoding_processes(cpus=None):
+    """
+    Processes for the CPU-bound encoding: one per core left after the scanning thread.
+
+    With one or two cores a separate process only adds pickling, so 0
+    (encode in the calling process) is returned.
+    """
+    cpus = cpus or os.cpu_count() or 1
+    return cpus - 1 if cpus > 2 else 0
+
+
+def adaptive_scan(root, out, controller=None, processes=None, schema='default', batch_size=2000,
+                  onerror=None, limiter=None, prefix_depth=3, dir_levels=0):
+    """
+    Scans root into filesystem_stat line protocol with threads for stat and processes for encoding.
+
+    Args:
+        root (str): Directory to scan (its own entry is not emitted).
+        out: Text stream for the line protocol.
+        controller (HillClimbingController): Sizes the stat thread pool.
+        processes (int): Encoding processes; None picks encoding_processes(), 0 encodes in this process.
+        batch_size (int): Records per encoding task.
+        limiter (TokenBucket): Optional I/O budget shared by the stat threads.
+
+    Returns:
+        dict: entries, elapsed, final stat thread count and encoding processes used.
+    """
+    controller = controller or HillClimbingController()
+    processes = encoding_processes() if processes is None else processes
+    uid = os.geteuid()
+    gids = set(os.getgroups()) | {os.getegid()}
+    initargs = (uid, gids, schema, prefix_depth, dir_levels)
+    pool = multiprocessing.Pool(processes, initializer=init_encoder, initargs=initargs) if processes else None
+    if pool is None:
+        init_encoder(*initargs)
+    in_flight = []
+    batch = []
+    entries = 0
+    start = time.perf_counter()
+
+    def submit(records):
+        if pool is None:
+            out.write(encode_records(records))
+        else:
+            in_flight.append(pool.apply_async(encode_records, (records,)))
+            # Bound the encoded-but-unwritten backlog to the current worker limit,
+            # so memory does not grow with the tree when encoding falls behind
+            while len(in_flight) > max(controller.workers, processes):
+                out.write(in_flight.pop(0).get())
+            # Write finished batches in submission order
+            while in_flight and in_flight[0].ready():
+                out.write(in_flight.pop(0).get())
+
+    try:
+        task = scan_directory if limiter is None else functools.partial(scan_directory, limiter=limiter)
+        for records, errors in AdaptiveStatPool(controller, task).run(root):
+            if onerror is not None:
+                for e in errors:
+                    onerror(e)
+            entries += len(records)
+            batch.extend(records)
+            if len(batch) >= batch_size:
+                submit(batch)
+                batch = []
+        if batch:
+            submit(batch)
+        for result in in_flight:
+            out.write(result.get())
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return {'entries': entries, 'elapsed': time.perf_counter() - start,
+            'threads': controller.workers, 'processes': processes}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="filesystem_stat scan with self-tuning concurrency")
+    parser.add_argument("path", help="Directory to scan")
+    parser.add_argument("-o", "--output", help="Write line protocol here instead of stdout")
+    parser.add_argument("--min-threads", type=int, default=1)
+    parser.add_argument("--max-threads", type=int, default=64)
+    parser.add_argument("--processes", type=int, help="Encoding processes (default: cores - 1, or 0 on <= 2 cores)")
+    parser.add_argument("--window", type=float, default=0.5, help="Seconds per measurement window")
+    args = parser.parse_args()
+
+    def report(e):
+        print(f"{e.filename}: {e.strerror}", file=sys.stderr)
+
+    controller = HillClimbingController(initial=2, minimum=args.min_threads, maximum=args.max_threads,
+                                        window=args.window)
+    out = open(args.output, 'w', encoding='utf-8', errors='surrogateescape') if args.output else sys.stdout
+    try:
+        summary = adaptive_scan(args.path, out, controller, args.processes, onerror=report)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{summary['entries']} entries in {summary['elapsed']:.2f}s with {summary['processes']} encoding "
+          f"processes", file=sys.stderr)
+    print(controller.format_report(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+import os
+import sys
+import time
+
+from lfs_lineproto import LineProtocolEncoder
+
+
+class DirTotals:
+    """Running totals for one directory while the walk is below it."""
+
+    __slots__ = ('path', 'parent', 'depth', 'size', 'files', 'dirs',
+                 'direct_size', 'direct_files', 'pending')
+
+    def __init__(self, path, parent, depth):
+        self.path = path
+        self.parent = parent
+        self.depth = depth
+        self.size = 0
+        self.files = 0
+        self.dirs = 0
+        self.direct_size = 0
+        self.direct_files = 0
+        self.pending = 0  # subdirectories not finished yet
+
+
+def iter_directory_totals(root, onerror=None):
+    """
+    Computes recursive size, file count and dir count for every directory in one pass.
+
+    Each directory is listed exactly once. Its own regular files are summed while
+    listing, and once all of its subdirectories are finished its totals are added
+    to the parent's, so every file is counted once instead of once per ancestor.
+    Directories are yielded as soon as they are complete (children before
+    parents), so only the directories on the current walk frontier stay in memory.
+
+    Args:
+        root (str): The directory to aggregate.
+        onerror (callable): Called with the OSError when a directory or entry cannot be read.
+
+    Yields:
+        DirTotals: One finished directory at a time, the root last.
+    """
+    stack = [DirTotals(root, None, 0)]
+    while stack:
+        node = stack.pop()
+        try:
+            with os.scandir(node.path) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            node.dirs += 1
+                            node.pending += 1
+                            stack.append(DirTotals(entry.path, node, node.depth + 1))
+                        elif entry.is_file(follow_symlinks=False):
+                            node.direct_size += entry.stat(follow_symlinks=False).st_size
+                            node.direct_files += 1
+                    except OSError as e:
+                        if onerror is not None:
+                            onerror(e)
+        except OSError as e:
+            if onerror is not None:
+                onerror(e)
+
+        node.size += node.direct_size
+        node.files += node.direct_files
+        # Propagate every directory that just became complete up the parent chain
+        while node is not None and node.pending == 0:
+            yield node
+            parent = node.parent
+            if parent is not None:
+                parent.size += node.size
+                parent.files += node.files
+                parent.dirs += node.dirs
+                parent.pending -= 1
+            node = parent
+
+
+def directory_totals(root, onerror=None):
+    """
+    Returns the recursive totals for every directory under root.
+
+    Returns:
+        dict: path -> (size, file_count, dir_count)
+    """
+    return {d.path: (d.size, d.files, d.dirs) for d in iter_directory_totals(root, onerror)}
+
+
+def add_totals(encoder, totals, timestamp):
+    """Adds one directory's totals to a LineProtocolEncoder as a filesystem_dir_stat point."""
+    encoder.add("filesystem_dir_stat",
+                {'directory': totals.path, 'depth': totals.depth},
+                {'size': totals.size, 'file_count': totals.files, 'dir_count': totals.dirs,
+                 'direct_size': totals.direct_size, 'direct_file_count': totals.direct_files},
+                timestamp)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"Usage: {sys.argv[0]} <directory>", file=sys.stderr)
+        sys.exit(1)
+    root = sys.argv[1]
+    timestamp = int(time.time() * 1000000000)  # Nanoseconds since epoch
+
+    def report(e):
+        print(f"Error: {e}", file=sys.stderr)
+
+    encoder = LineProtocolEncoder()
+    for totals in iter_directory_totals(root, onerror=report):
+        add_totals(encoder, totals, timestamp)
+        if len(encoder) >= 5000:
+            encoder.write_to(sys.stdout)
+    encoder.write_to(sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
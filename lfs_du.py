@@ -0,0 +1,147 @@
+import argparse
+import math
+import multiprocessing
+import os
+import stat
+import sys
+import time
+
+from lfs_lineproto import LineProtocolEncoder
+
+
+def subtree_usage(path):
+    """
+    Sums one directory tree, like `du -s` but with exact byte counts.
+
+    Apparent size is the sum of st_size, allocated size the sum of
+    st_blocks * 512, both including the directories themselves. A file with
+    several hard links inside the tree is counted once. Symlinks are not
+    followed.
+
+    Returns:
+        dict: path, apparent, allocated, files, dirs, errors, plus linked:
+            (dev, ino) -> (apparent, allocated) of every multi-link file counted,
+            so the caller can deduplicate links shared between trees.
+    """
+    usage = {'path': path, 'apparent': 0, 'allocated': 0, 'files': 0, 'dirs': 0, 'errors': 0, 'linked': {}}
+    linked = usage['linked']
+    try:
+        st = os.lstat(path)
+    except OSError:
+        usage['errors'] += 1
+        return usage
+    usage['apparent'] += st.st_size
+    usage['allocated'] += st.st_blocks * 512
+    if not stat.S_ISDIR(st.st_mode):
+        usage['files'] += 1
+        return usage
+    usage['dirs'] += 1
+
+    stack = [path]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        usage['errors'] += 1
+                        continue
+                    if stat.S_ISDIR(st.st_mode):
+                        usage['dirs'] += 1
+                        stack.append(entry.path)
+                    else:
+                        if st.st_nlink > 1:
+                            key = (st.st_dev, st.st_ino)
+                            if key in linked:
+                                continue
+                            linked[key] = (st.st_size, st.st_blocks * 512)
+                        usage['files'] += 1
+                    usage['apparent'] += st.st_size
+                    usage['allocated'] += st.st_blocks * 512
+        except OSError:
+            usage['errors'] += 1
+    return usage
+
+
+def child_directories(root):
+    """Returns the immediate subdirectories of root, sorted, like `find root -mindepth 1 -maxdepth 1 -type d`."""
+    with os.scandir(root) as it:
+        return sorted(entry.path for entry in it if entry.is_dir(follow_symlinks=False))
+
+
+def iter_child_usage(root, num_workers=None):
+    """
+    Computes subtree_usage for every immediate child directory of root in parallel.
+
+    Results are yielded in sorted path order as they become available. As with
+    `du -s a b c`, a file hard-linked into several children is counted under
+    the first child only; later children have its size subtracted.
+
+    Yields:
+        dict: The subtree_usage result of each child, with linked removed.
+    """
+    seen = set()
+    with multiprocessing.Pool(num_workers or os.cpu_count()) as pool:
+        for usage in pool.imap(subtree_usage, child_directories(root)):
+            for key, (apparent, allocated) in usage.pop('linked').items():
+                if key in seen:
+                    usage['apparent'] -= apparent
+                    usage['allocated'] -= allocated
+                    usage['files'] -= 1
+                else:
+                    seen.add(key)
+            yield usage
+
+
+def human_size(size):
+    """Formats a byte count like `du -h`: powers of 1024, rounded up, one decimal below 10 (4.0K, 12M)."""
+    value = size
+    units = ('K', 'M', 'G', 'T', 'P', 'E')
+    unit = -1
+    while value >= 1024 and unit < len(units) - 1:
+        value /= 1024
+        unit += 1
+    if unit < 0:
+        return str(size)
+    if value < 10:
+        tenths = math.ceil(value * 10)
+        if tenths < 100:
+            return f"{tenths / 10:.1f}{units[unit]}"
+        value = 10
+    value = math.ceil(value)
+    if value == 1024 and unit < len(units) - 1:
+        return f"1.0{units[unit + 1]}"
+    return f"{value}{units[unit]}"
+
+
+def add_usage(encoder, usage, root, timestamp):
+    """Adds one filesystem_du point for a child directory."""
+    encoder.add("filesystem_du", {'directory': usage['path'], 'parent': root},
+                {'apparent_size': usage['apparent'], 'allocated_size': usage['allocated'],
+                 'file_count': usage['files'], 'dir_count': usage['dirs'], 'errors': usage['errors']},
+                timestamp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact apparent and allocated size of every child directory")
+    parser.add_argument("path", help="Directory whose immediate subdirectories are measured")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    args = parser.parse_args()
+
+    encoder = LineProtocolEncoder()
+    timestamp = time.time_ns()
+    start = time.perf_counter()
+    children = 0
+    for usage in iter_child_usage(args.path, args.workers):
+        add_usage(encoder, usage, args.path, timestamp)
+        # One line per child, written as soon as that child is done
+        encoder.write_to(sys.stdout)
+        sys.stdout.flush()
+        children += 1
+    print(f"{children} directories in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
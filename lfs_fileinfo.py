@@ -1,16 +1,28 @@
 import os
-import pwd
-import grp
+import stat
+import sys
 import time
 
-def get_file_info(path):
+from lfs_influx_writer import InfluxWriter
+from lfs_lineproto import LineProtocolEncoder
+from lfs_owner_cache import OwnerResolver
+from lfs_scandir_walk import scandir_walk
+from lfs_schema import file_info_point
+
+# One resolver per process so each uid/gid goes through NSS only once
+owner_resolver = OwnerResolver()
+
+def stat_to_file_info(stat_info, resolver=None):
+    resolver = resolver or owner_resolver
+    size = stat_info.st_size
+    owner = resolver.user(stat_info.st_uid)
+    group = resolver.group(stat_info.st_gid)
+    permissions = oct(stat_info.st_mode)[-3:]
+    return size, owner, group, permissions
+
+def get_file_info(path, resolver=None):
     try:
-        stat_info = os.stat(path)
-        size = stat_info.st_size
-        owner = pwd.getpwuid(stat_info.st_uid).pw_name
-        group = grp.getgrgid(stat_info.st_gid).gr_name
-        permissions = oct(stat_info.st_mode)[-3:]
-        return size, owner, group, permissions
+        return stat_to_file_info(os.stat(path), resolver)
     except Exception as e:
         return None, None, None, None
 
@@ -20,26 +32,66 @@ def walk_directory(directory):
             path = os.path.join(root, file)
             yield path
 
+def iter_file_stats(directory):
+    """
+    Yields (path, stat_result) for the same files walk_directory + get_file_info report.
+
+    Regular entries reuse the lstat scandir_walk already did. Symlinks get their
+    target's stat like os.stat gave before; links to directories (which os.walk
+    lists as directories) and dangling links are skipped.
+    """
+    for path, stat_info in scandir_walk(directory):
+        if stat.S_ISLNK(stat_info.st_mode):
+            try:
+                stat_info = os.stat(path)
+            except OSError:
+                continue
+            if stat.S_ISDIR(stat_info.st_mode):
+                continue
+        yield path, stat_info
+
 def main():
     base_directory = "/"  # Set to the root directory
     current_time = int(time.time() * 1000000000)  # Nanoseconds since epoch
+    files = 0
     
-    with open("/tmp/file_info.lp", "w") as f:
-        for path in walk_directory(base_directory):
-            size, owner, group, permissions = get_file_info(path)
-            if size is not None:
-                line = f'file_info,path="{path}",owner="{owner}",group="{group}",permissions="{permissions}" size={size}i {current_time}\n'
-                f.write(line)
-                current_time += 1  # Increment time for unique timestamps
+    encoder = LineProtocolEncoder()
+    # FILE_INFO_SCHEMA=bounded moves path to a field instead of one series per file;
+    # the default keeps the layout existing dashboards group by
+    schema = os.getenv("FILE_INFO_SCHEMA", "compat")
+    # With INFLUX_URL set, post straight to InfluxDB instead of the .lp file Telegraf re-reads
+    influx_url = os.getenv("INFLUX_URL")
+    if influx_url:
+        output = InfluxWriter(influx_url, database=os.getenv("INFLUX_DB", "exampleDB"),
+                              spool_dir="/tmp/file_info_spool")
+        # Deliver what earlier runs could not before adding to the spool
+        output.replay_spool()
+    else:
+        output = open("/tmp/file_info.lp", "w", encoding="utf-8", errors="surrogateescape")
+    with output as f:
+        # scandir_walk hands back the stat it already did, so only symlinks get a second os.stat
+        for path, stat_info in iter_file_stats(base_directory):
+            size, owner, group, permissions = stat_to_file_info(stat_info)
+            tags, fields = file_info_point(path, size, owner, group, permissions, schema)
+            encoder.add("file_info", tags, fields, current_time)
+            if len(encoder) >= 5000:
+                encoder.write_to(f)
+            files += 1
+            current_time += 1  # Increment time for unique timestamps
+        encoder.write_to(f)
+
+    print(f"Scanned {files} files under {base_directory}", file=sys.stderr)
+    print(owner_resolver.format_report(), file=sys.stderr)
+    if influx_url:
+        print(output.format_report(), file=sys.stderr)
 
 if __name__ == "__main__":
     main()
 
 
 
-
-
-
+# Telegraf / influx CLI notes for loading the .lp output
+'''
 [[inputs.exec]]
   commands = ["cat /tmp/file_info.lp"]
   data_format = "influx"
@@ -73,4 +125,5 @@ influx -host localhost -port 8086 -database 'exampleDB'
 
 
 anbu992003@LAPTOP-ODISB5A1:~$ nohup python3 fileinfo.py 2>/dev/null &
-[1] 136
\ No newline at end of file
+[1] 136
+'''
@@ -1,8 +1,20 @@
 import os
 import multiprocessing
+import queue
 import stat
-import pwd
 import json
+import sys
+import threading
+import time
+
+from lfs_owner_cache import OwnerResolver
+
+# Per-process owner cache; replaced by the preloaded copy in each pool worker
+owner_resolver = OwnerResolver()
+
+def init_worker(resolver):
+    global owner_resolver
+    owner_resolver = resolver
 
 def get_file_stats(file_path):
     try:
@@ -10,7 +22,7 @@ def get_file_stats(file_path):
         file_info = {
             'path': file_path,
             'size': stats.st_size,
-            'owner': pwd.getpwuid(stats.st_uid).pw_name,
+            'owner': owner_resolver.user(stats.st_uid),
             'permissions': stat.filemode(stats.st_mode)
         }
         return file_info
@@ -20,11 +32,14 @@ def get_file_stats(file_path):
 
 def process_files(file_paths):
     results = []
+    before = owner_resolver.stats()
     for file_path in file_paths:
         file_stats = get_file_stats(file_path)
         if file_stats:
             results.append(file_stats)
-    return results
+    # A worker handles several chunks, so report only this chunk's share of the counters
+    after = owner_resolver.stats()
+    return results, {key: after[key] - before[key] for key in after}
 
 def get_all_file_paths(directory):
     file_paths = []
@@ -33,27 +48,161 @@ def get_all_file_paths(directory):
             file_paths.append(os.path.join(root, file))
     return file_paths
 
-def parallel_process_files(file_paths, num_workers):
-    chunk_size = len(file_paths) // num_workers
+def parallel_process_files(file_paths, num_workers, resolver=None):
+    # Fewer files than workers would otherwise give a chunk size of 0
+    chunk_size = max(1, len(file_paths) // num_workers)
     chunks = [file_paths[i:i + chunk_size] for i in range(0, len(file_paths), chunk_size)]
 
-    with multiprocessing.Pool(num_workers) as pool:
+    # Preload names once here instead of every worker hitting NSS for the same ids
+    resolver = resolver or OwnerResolver().preload()
+    with multiprocessing.Pool(num_workers, initializer=init_worker, initargs=(resolver,)) as pool:
         results = pool.map(process_files, chunks)
 
     # Flatten the list of results
-    flat_results = [item for sublist in results for item in sublist]
+    flat_results = [item for sublist, _ in results for item in sublist]
+    for _, worker_stats in results:
+        resolver.merge_stats(worker_stats)
     return flat_results
 
+def walk_file_paths(directory, path_queue, batch_size, num_workers):
+    """
+    Producer for the streaming pipeline: lists directories and queues file paths in batches.
+
+    Only the directory listing happens here (is_dir comes from d_type), the stat
+    itself is left to the workers. put() blocks when the queue is full, so the
+    walk never runs more than queue_size batches ahead of the stat workers.
+    """
+    batch = []
+    stack = [directory]
+    try:
+        while stack:
+            current = stack.pop()
+            try:
+                with os.scandir(current) as it:
+                    for entry in it:
+                        try:
+                            is_dir = entry.is_dir(follow_symlinks=False)
+                        except OSError:
+                            is_dir = False
+                        if is_dir:
+                            stack.append(entry.path)
+                            continue
+                        batch.append(entry.path)
+                        if len(batch) >= batch_size:
+                            path_queue.put(batch)
+                            batch = []
+            except OSError as e:
+                print(f"Error listing {current}: {e}", file=sys.stderr)
+        if batch:
+            path_queue.put(batch)
+    finally:
+        # One end marker per worker, even if the walk died, so the pipeline always drains
+        for _ in range(num_workers):
+            path_queue.put(None)
+
+def stat_worker(path_queue, record_queue):
+    """Consumer: stats each queued batch of paths and passes the records on to the writer."""
+    while True:
+        batch = path_queue.get()
+        if batch is None:
+            record_queue.put(None)
+            return
+        records = [info for info in (get_file_stats(p) for p in batch) if info]
+        if records:
+            record_queue.put(records)
+
+def stream_file_stats(directory, out, num_workers=8, queue_size=64, batch_size=256, flush_interval=1.0):
+    """
+    Walks, stats and writes file records concurrently instead of list-then-chunk.
+
+    A walker thread feeds bounded queues of path batches to a pool of stat
+    threads (os.stat releases the GIL, so threads overlap the metadata I/O), and
+    the calling thread writes each record as a JSON line as soon as it arrives.
+    At most queue_size batches are in flight on each queue, so memory stays flat
+    regardless of the tree size.
+
+    Args:
+        directory (str): The directory to scan.
+        out (file): Text stream the JSON lines are written to.
+        num_workers (int): Number of stat threads.
+        queue_size (int): Maximum number of batches waiting on each queue.
+        batch_size (int): Paths per batch handed from the walker to the workers.
+        flush_interval (float): Seconds between flushes of the output stream.
+
+    Returns:
+        dict: files written, elapsed seconds and time to the first record.
+    """
+    path_queue = queue.Queue(maxsize=queue_size)
+    record_queue = queue.Queue(maxsize=queue_size)
+    threads = [threading.Thread(target=walk_file_paths, args=(directory, path_queue, batch_size, num_workers), daemon=True)]
+    threads += [threading.Thread(target=stat_worker, args=(path_queue, record_queue), daemon=True)
+                for _ in range(num_workers)]
+
+    start = time.monotonic()
+    first_record = None
+    last_flush = start
+    files = 0
+    for t in threads:
+        t.start()
+
+    finished = 0
+    while finished < num_workers:
+        records = record_queue.get()
+        if records is None:
+            finished += 1
+            continue
+        if first_record is None:
+            first_record = time.monotonic() - start
+        for record in records:
+            out.write(json.dumps(record))
+            out.write("\n")
+        files += len(records)
+        now = time.monotonic()
+        if now - last_flush >= flush_interval:
+            out.flush()
+            last_flush = now
+    out.flush()
+
+    for t in threads:
+        t.join()
+    return {
+        'files': files,
+        'elapsed': time.monotonic() - start,
+        'first_record': first_record,
+    }
+
 if __name__ == "__main__":
     directory_to_scan = "/path/to/scan"  # Change this to the directory you want to scan
     output_file = "filesystem_stats.json"
     num_workers = multiprocessing.cpu_count()
 
+    if "--stream" in sys.argv:
+        # Streaming mode writes one JSON record per line as the scan progresses
+        output_file = "filesystem_stats.jsonl"
+        with open(output_file, 'w') as f:
+            summary = stream_file_stats(directory_to_scan, f, num_workers=num_workers)
+        print(f"Wrote {summary['files']} records to {output_file} in {summary['elapsed']:.1f}s "
+              f"(first record after {summary['first_record'] or 0:.2f}s)")
+        print(owner_resolver.format_report())
+        sys.exit(0)
+
+    if "--columnar" in sys.argv:
+        # Typed columns instead of an indented list of dicts; read back with lfs_columnar.read_snapshot
+        from lfs_columnar import write_scan
+        output_file = "filesystem_stats.arrow"
+        resolver = OwnerResolver().preload()
+        writer = write_scan(directory_to_scan, output_file, resolver)
+        print(f"Wrote {writer.rows} records in {writer.row_groups} row groups to {output_file}")
+        print(resolver.format_report())
+        sys.exit(0)
+
     print("Gathering file paths...")
     file_paths = get_all_file_paths(directory_to_scan)
 
     print("Processing files in parallel...")
-    file_stats = parallel_process_files(file_paths, num_workers)
+    resolver = OwnerResolver().preload()
+    file_stats = parallel_process_files(file_paths, num_workers, resolver)
+    print(resolver.format_report())
 
     print(f"Writing results to {output_file}...")
     with open(output_file, 'w') as f:
@@ -0,0 +1,226 @@
+import argparse
+import multiprocessing
+import os
+import pwd
+import stat
+import sys
+import time
+
+from lfs_lineproto import LineProtocolEncoder
+from lfs_owner_cache import OwnerResolver, unknown_name
+from lfs_schema import SCHEMAS
+from lfs_stat_collector import StatRecord, add_record, format_compat
+
+# One record per entry: ten NUL-terminated fields and an empty field to end the
+# record. None of the fields can be empty, so "\0\0" only ever ends a record,
+# even for names containing newlines. `lfs find` takes the same --printf string.
+FIND_PRINTF = r'%s\0%p\0%m\0%u\0%g\0%T@\0%A@\0%y\0%U\0%G\0\0'
+RECORD_END = b'\0\0'
+FIELDS = 10
+
+# find -printf %y letters
+TYPE_BITS = {
+    b'f': stat.S_IFREG,
+    b'd': stat.S_IFDIR,
+    b'l': stat.S_IFLNK,
+    b'p': stat.S_IFIFO,
+    b's': stat.S_IFSOCK,
+    b'c': stat.S_IFCHR,
+    b'b': stat.S_IFBLK,
+}
+
+# Per-process settings, set by init_worker
+_settings = {}
+
+
+# fixtures/find_printf_sample.nul is a recorded `find fi -printf FIND_PRINTF` of a
+# tree with spaces, commas, quotes, a newline, a fifo and a symlink in its names;
+# fixtures/find_printf_sample.lp is its expected output:
+#   python3 lfs_find_ingest.py fixtures/find_printf_sample.nul --uid 65534 \
+#       --timestamp 1700000000000000000 | diff - fixtures/find_printf_sample.lp
+
+
+def find_command(root):
+    """The find invocation whose output parse_chunk expects."""
+    return ['find', root, '-printf', FIND_PRINTF]
+
+
+def iter_chunks(stream, chunk_size=1 << 20):
+    """
+    Reads a binary stream in blocks and yields chunks that end on a record boundary.
+
+    Each chunk holds whole records only, so chunks can be parsed independently
+    and in any process.
+    """
+    pending = b''
+    while True:
+        block = stream.read(chunk_size)
+        if not block:
+            break
+        pending += block
+        cut = pending.rfind(RECORD_END)
+        if cut < 0:
+            continue
+        yield pending[:cut + len(RECORD_END)]
+        pending = pending[cut + len(RECORD_END):]
+    if pending.strip(b'\0'):
+        # A truncated last record (find killed mid-write); parse_chunk reports it as malformed
+        yield pending
+
+
+def parse_record(fields, resolver, uid, gids):
+    """
+    Turns the ten fields of one record into a StatRecord, without touching the filesystem.
+
+    find has already resolved the names, so they are seeded into the resolver
+    instead of being looked up again. For ids without a passwd/group entry
+    find prints the number, which is replaced by the resolver's fallback
+    (UNKNOWN in compat mode, like `stat -c %U/%G`).
+    """
+    size, path, mode, user, group, mtime, atime, kind, st_uid, st_gid = fields
+    if user == st_uid:
+        user = resolver.fallback(int(st_uid))
+    else:
+        user = user.decode('utf-8', 'surrogateescape')
+    if group == st_gid:
+        group = resolver.fallback(int(st_gid))
+    else:
+        group = group.decode('utf-8', 'surrogateescape')
+    st_uid = int(st_uid)
+    st_gid = int(st_gid)
+    resolver.users.setdefault(st_uid, user)
+    resolver.groups.setdefault(st_gid, group)
+    st = os.stat_result((TYPE_BITS.get(kind, 0) | int(mode, 8), 0, 0, 1, st_uid, st_gid, int(size),
+                         int(atime.split(b'.')[0]), int(mtime.split(b'.')[0]), 0))
+    return StatRecord(os.fsdecode(path), st, resolver, uid, gids)
+
+
+def init_worker(settings):
+    _settings.clear()
+    _settings.update(settings)
+    _settings['resolver'] = OwnerResolver(fallback=unknown_name) if settings['compat'] else OwnerResolver()
+
+
+def parse_chunk(chunk):
+    """
+    Parses one chunk of find output into line protocol.
+
+    Returns:
+        tuple: (line protocol text, records parsed, malformed records)
+    """
+    settings = _settings
+    resolver = settings['resolver']
+    uid, gids = settings['uid'], settings['gids']
+    timestamp = settings['timestamp']
+    encoder = LineProtocolEncoder()
+    compat_lines = []
+    records = malformed = 0
+    for raw in chunk.split(RECORD_END):
+        if not raw:
+            continue
+        fields = raw.lstrip(b'\0').split(b'\0')
+        if len(fields) != FIELDS:
+            malformed += 1
+            continue
+        try:
+            rec = parse_record(fields, resolver, uid, gids)
+        except ValueError:
+            malformed += 1
+            continue
+        records += 1
+        ts = timestamp if timestamp is not None else time.time_ns()
+        if settings['compat']:
+            compat_lines.append(format_compat(rec, ts))
+        else:
+            add_record(encoder, rec, ts, settings['schema'], settings['prefix_depth'], settings['dir_levels'])
+    return (''.join(compat_lines) if settings['compat'] else encoder.getvalue()), records, malformed
+
+
+def ingest(stream, out, num_workers=None, chunk_size=1 << 20, uid=None, gids=None, schema='default',
+           prefix_depth=3, dir_levels=0, compat=False, timestamp=None):
+    """
+    Converts a NUL-delimited find -printf stream (see FIND_PRINTF) to filesystem_stat line protocol.
+
+    Chunks are parsed by a pool of worker processes and written in input order.
+
+    Args:
+        stream: Binary stream with the find output.
+        out: Text stream for the line protocol.
+        num_workers (int): Parser processes; 1 parses in this process.
+        uid (int), gids (set): Identity the writable tag is evaluated for (default: this process).
+        timestamp (int): Fixed timestamp for every point; by default each point gets the time it is parsed.
+
+    Returns:
+        dict: records, malformed, chunks
+    """
+    settings = {
+        'uid': os.geteuid() if uid is None else uid,
+        'gids': set(os.getgroups()) | {os.getegid()} if gids is None else set(gids),
+        'schema': schema, 'prefix_depth': prefix_depth, 'dir_levels': dir_levels,
+        'compat': compat, 'timestamp': timestamp,
+    }
+    totals = {'records': 0, 'malformed': 0, 'chunks': 0}
+    num_workers = num_workers or os.cpu_count()
+    if num_workers == 1:
+        init_worker(settings)
+        results = map(parse_chunk, iter_chunks(stream, chunk_size))
+        pool = None
+    else:
+        pool = multiprocessing.Pool(num_workers, initializer=init_worker, initargs=(settings,))
+        results = pool.imap(parse_chunk, iter_chunks(stream, chunk_size))
+    try:
+        for text, records, malformed in results:
+            out.write(text)
+            totals['records'] += records
+            totals['malformed'] += malformed
+            totals['chunks'] += 1
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    out.flush()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Parse NUL-delimited find -printf output into filesystem_stat line protocol",
+        epilog=f"Produce the input with: find DIR -printf '{FIND_PRINTF}'")
+    parser.add_argument("input", nargs="?", default="-", help="find output file, or - for stdin (default)")
+    parser.add_argument("-o", "--output", help="Write line protocol here instead of stdout")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="Parser processes (default: CPU count)")
+    parser.add_argument("--chunk-size", type=int, default=1 << 20, help="Bytes per parallel chunk")
+    parser.add_argument("--compat", action="store_true", help="filestat_master.sh output format")
+    parser.add_argument("--schema", choices=SCHEMAS[:2], default="default")
+    parser.add_argument("--prefix-depth", type=int, default=3)
+    parser.add_argument("--dir-levels", type=int, default=0)
+    parser.add_argument("--uid", type=int, help="Evaluate the writable tag for this uid instead of the current user")
+    parser.add_argument("--timestamp", type=int, help="Use this timestamp (ns) for every point")
+    args = parser.parse_args()
+
+    gids = None
+    if args.uid is not None:
+        try:
+            entry = pwd.getpwuid(args.uid)
+            gids = os.getgrouplist(entry.pw_name, entry.pw_gid)
+        except KeyError:
+            gids = []
+
+    stream = sys.stdin.buffer if args.input == "-" else open(args.input, 'rb')
+    out = open(args.output, 'w', encoding='utf-8', errors='surrogateescape') if args.output else sys.stdout
+    start = time.perf_counter()
+    try:
+        totals = ingest(stream, out, args.workers, args.chunk_size, args.uid, gids, args.schema,
+                        args.prefix_depth, args.dir_levels, args.compat, args.timestamp)
+    finally:
+        if stream is not sys.stdin.buffer:
+            stream.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    print(f"{totals['records']} records in {totals['chunks']} chunks, {totals['malformed']} malformed, "
+          f"{elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import gzip
+import json
+import os
+import stat
+import sys
+import time
+
+from lfs_lineproto import LineProtocolEncoder
+
+SNAPSHOT_VERSION = 1
+
+
+def load_snapshot(path):
+    """
+    Loads the previous scan, or returns an empty snapshot when there is none yet.
+
+    The snapshot holds:
+        entries: "dev:ino" -> [path, size, mtime_ns, is_dir]; files with more than
+                 one hard link have one entry per name, keyed "dev:ino:path"
+        dirs:    path -> [mtime_ns, [child names]]
+    """
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except FileNotFoundError:
+        return {'version': SNAPSHOT_VERSION, 'root': None, 'entries': {}, 'dirs': {}}
+    if snapshot.get('version') != SNAPSHOT_VERSION:
+        raise ValueError(f"{path}: unsupported snapshot version {snapshot.get('version')}")
+    return snapshot
+
+
+def save_snapshot(path, snapshot):
+    """Writes the snapshot next to its final name and renames it into place."""
+    tmp = path + '.tmp'
+    with gzip.open(tmp, 'wt', encoding='utf-8', compresslevel=1) as f:
+        json.dump(snapshot, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+class IncrementalScan:
+    """
+    Rescans a tree against the previous snapshot and reports only what changed.
+
+    Every entry is identified by (st_dev, st_ino) and compared on size and
+    mtime. Hard links are the exception: all names of an inode share that
+    identity, so a file with st_nlink > 1 gets one entry per name, keyed by
+    (st_dev, st_ino, path). lfs_snapshot_diff joins its columnar snapshots
+    by the same rule.
+
+    A directory whose mtime is unchanged has the same set of names as last
+    time, so its listing is taken from the snapshot instead of reading the
+    directory again; its entries are still lstat'ed, since a file's content
+    can change without touching the directory. Entries from the previous
+    snapshot that were not seen again are reported as deleted, except below a
+    directory or entry that could not be read this time: those keep their
+    previous state and count as errors, so a transient EACCES or EIO does not
+    wipe a subtree's series downstream.
+    """
+
+    def __init__(self, previous, onerror=None, limiter=None):
+        self.previous = previous
+        self.onerror = onerror
+        self.limiter = limiter
+        self.entries = {}
+        self.dirs = {}
+        self.dirs_listed = 0
+        self.dirs_skipped = 0
+        self.entries_seen = 0
+        self.errors = 0
+        self.kept = 0
+        self._matched = set()
+        self._unreadable = []
+
+    def _report(self, e, path):
+        self.errors += 1
+        self._unreadable.append(path)
+        if self.onerror is not None:
+            self.onerror(e)
+
+    def _visit(self, path, st):
+        """Records one entry and returns the changes it represents."""
+        inode = f"{st.st_dev}:{st.st_ino}"
+        is_dir = stat.S_ISDIR(st.st_mode)
+        if st.st_nlink > 1 and not is_dir:
+            key, alt = f"{inode}:{path}", inode
+        else:
+            key, alt = inode, f"{inode}:{path}"
+        self.entries[key] = [path, st.st_size, st.st_mtime_ns, is_dir]
+        self.entries_seen += 1
+        previous = self.previous['entries']
+        old = previous.get(key)
+        if old is None:
+            # The link count changed since the last scan, so the entry was stored
+            # under the other form of the key; only the same name is a match
+            old = previous.get(alt)
+            if old is None or old[0] != path:
+                return [('created', path, st, None)]
+            self._matched.add(alt)
+        if old[0] != path:
+            # A rename and a freed inode being reused look the same; points are
+            # keyed by path downstream, so report the old path gone and the new one created
+            return [('deleted', old[0], None, old), ('created', path, st, None)]
+        # Directory sizes and mtimes change with every create/delete inside and
+        # those entries are reported themselves
+        if not is_dir and (old[1] != st.st_size or old[2] != st.st_mtime_ns):
+            return [('modified', path, st, old)]
+        return []
+
+    def _lstat(self, path):
+        """os.lstat, taken from the limiter's budget when there is one."""
+        limiter = self.limiter
+        if limiter is None:
+            return os.lstat(path)
+        limiter.acquire()
+        start = time.perf_counter()
+        try:
+            return os.lstat(path)
+        finally:
+            limiter.observe(time.perf_counter() - start)
+
+    def _list(self, path, st):
+        prev = self.previous['dirs'].get(path)
+        if prev is not None and prev[0] == st.st_mtime_ns:
+            self.dirs_skipped += 1
+            names = prev[1]
+        else:
+            self.dirs_listed += 1
+            if self.limiter is not None:
+                self.limiter.acquire()
+            names = os.listdir(path)
+        self.dirs[path] = [st.st_mtime_ns, names]
+        return names
+
+    def run(self, root):
+        """
+        Walks root and yields (change, path, stat_result, previous_entry) tuples.
+
+        change is "created", "modified" or "deleted"; for deletions the stat is
+        None and previous_entry is the snapshot entry [path, size, mtime_ns, is_dir].
+        After the generator is exhausted, snapshot() returns the new state.
+        """
+        try:
+            st = os.lstat(root)
+        except OSError as e:
+            self._report(e, root)
+            stack = []
+        else:
+            yield from self._visit(root, st)
+            stack = [(root, st)] if stat.S_ISDIR(st.st_mode) else []
+        while stack:
+            directory, dst = stack.pop()
+            try:
+                names = self._list(directory, dst)
+            except OSError as e:
+                self._report(e, directory)
+                continue
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    st = self._lstat(path)
+                except FileNotFoundError:
+                    continue  # gone since the cached listing; reported as deleted below
+                except OSError as e:
+                    self._report(e, path)
+                    continue
+                yield from self._visit(path, st)
+                if stat.S_ISDIR(st.st_mode):
+                    stack.append((path, st))
+
+        unreadable = set(self._unreadable)
+        below = tuple(path.rstrip('/') + '/' for path in unreadable)
+        for key, old in self.previous['entries'].items():
+            if key in self.entries or key in self._matched:
+                continue
+            if below and (old[0] in unreadable or old[0].startswith(below)):
+                # Not seen because it could not be read, not because it is gone
+                self.entries[key] = old
+                self.kept += 1
+                continue
+            yield ('deleted', old[0], None, old)
+        if below:
+            for path, listing in self.previous['dirs'].items():
+                if path not in self.dirs and (path in unreadable or path.startswith(below)):
+                    self.dirs[path] = listing
+
+    def snapshot(self, root):
+        return {'version': SNAPSHOT_VERSION, 'root': root, 'time': time.time(),
+                'entries': self.entries, 'dirs': self.dirs}
+
+
+def add_change(encoder, change, timestamp):
+    """Adds one change as a filesystem_change point."""
+    kind, path, st, old = change
+    if st is not None:
+        is_dir = stat.S_ISDIR(st.st_mode)
+        fields = {'path': path, 'size': st.st_size, 'modified_time': st.st_mtime_ns // 1000000000}
+    else:
+        is_dir = old[3]
+        fields = {'path': path, 'size': 0, 'modified_time': old[2] // 1000000000}
+    if kind == 'modified':
+        fields['previous_size'] = old[1]
+    encoder.add("filesystem_change", {'change': kind, 'type': "directory" if is_dir else "file"},
+                fields, timestamp)
+
+
+def run_incremental(root, snapshot_path, out, onerror=None, limiter=None):
+    """
+    Runs one incremental scan, writes the changes as line protocol and saves the new snapshot.
+
+    With a limiter (lfs_rate_limit.TokenBucket) every directory read and lstat
+    is taken from its budget.
+
+    Returns:
+        dict: change counts and how many directories were listed vs. taken from the snapshot.
+    """
+    previous = load_snapshot(snapshot_path)
+    if previous['root'] not in (None, root):
+        raise ValueError(f"{snapshot_path} was taken for {previous['root']}, not {root}")
+    scan = IncrementalScan(previous, onerror, limiter)
+    encoder = LineProtocolEncoder()
+    timestamp = time.time_ns()
+    counts = {'created': 0, 'modified': 0, 'deleted': 0}
+    for change in scan.run(root):
+        counts[change[0]] += 1
+        add_change(encoder, change, timestamp)
+        if len(encoder) >= 5000:
+            encoder.write_to(out)
+    encoder.write_to(out)
+    out.flush()
+    save_snapshot(snapshot_path, scan.snapshot(root))
+    counts.update(entries=scan.entries_seen, dirs_listed=scan.dirs_listed, dirs_skipped=scan.dirs_skipped,
+                  errors=scan.errors, kept=scan.kept)
+    return counts
+
+
+def main():
+    if len(sys.argv) < 3:
+        print(f"Usage: {sys.argv[0]} <directory> <snapshot.json.gz>", file=sys.stderr)
+        sys.exit(1)
+
+    def report(e):
+        print(f"{e.filename}: {e.strerror}", file=sys.stderr)
+
+    counts = run_incremental(sys.argv[1], sys.argv[2], sys.stdout, onerror=report)
+    print(f"{counts['created']} created, {counts['modified']} modified, {counts['deleted']} deleted "
+          f"of {counts['entries']} entries; {counts['dirs_listed']} dirs listed, "
+          f"{counts['dirs_skipped']} unchanged dirs taken from the snapshot; {counts['errors']} errors, "
+          f"{counts['kept']} unreadable entries kept from the snapshot", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+import gzip
+import http.client
+import os
+import sys
+import threading
+import time
+import urllib.parse
+
+# Outcomes of InfluxWriter._send
+SENT = 'sent'
+FAILED = 'failed'      # server or network trouble; worth retrying later
+REJECTED = 'rejected'  # 4xx: this body will never be accepted
+
+
+class InfluxWriter:
+    """
+    Posts line protocol to an InfluxDB /write endpoint in gzip-compressed batches.
+
+    Lines are buffered until batch_size lines are pending or flush_interval
+    seconds have passed, then sent over one keep-alive HTTP connection. Server
+    errors (5xx, 429) and connection failures are retried with exponential
+    backoff; a batch that still fails is written to spool_dir so nothing is lost,
+    and replay_spool() sends those files later. A batch the server rejects with
+    another 4xx (malformed points, auth) would fail the same way on every replay,
+    so it goes to spool_dir/rejected instead, where it is kept for inspection
+    but never resent.
+
+    The writer is file-like (write/flush/close), so it can replace the
+    /tmp/file_info.lp file that Telegraf used to re-read with `cat`:
+    LineProtocolEncoder.write_to(writer) works unchanged.
+    """
+
+    def __init__(self, url, database=None, precision='ns', batch_size=5000, flush_interval=10.0,
+                 max_retries=5, backoff=0.5, max_backoff=30.0, spool_dir=None, timeout=30.0,
+                 username=None, password=None, token=None, compresslevel=6):
+        """
+        Args:
+            url (str): Base URL such as http://localhost:8086, or a full .../write or
+                .../api/v2/write URL whose query string is used as given.
+            database (str): Target database (v1 `db` parameter).
+            precision (str): Timestamp precision of the lines.
+            batch_size (int): Lines per request; batches are cut at write() boundaries.
+            flush_interval (float): Maximum seconds a line waits in the buffer.
+            max_retries (int): Retries per batch before it is spooled.
+            backoff (float): First retry delay in seconds, doubled on every attempt.
+            max_backoff (float): Upper bound for a single retry delay.
+            spool_dir (str): Directory for batches that could not be delivered; rejected
+                batches go to its rejected/ subdirectory.
+            timeout (float): Socket timeout per request.
+            username (str): v1 user name.
+            password (str): v1 password.
+            token (str): v2 API token, sent as an Authorization header.
+            compresslevel (int): gzip level; 1 is usually enough for line protocol.
+        """
+        parsed = urllib.parse.urlsplit(url)
+        self.scheme = parsed.scheme or 'http'
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port
+        if parsed.path.rstrip('/').endswith('write'):
+            path, query = parsed.path, parsed.query
+        else:
+            params = {'precision': precision}
+            if database:
+                params['db'] = database
+            if username:
+                params['u'] = username
+            if password:
+                params['p'] = password
+            path, query = parsed.path.rstrip('/') + '/write', urllib.parse.urlencode(params)
+        self.request_path = f"{path}?{query}" if query else path
+        self.headers = {
+            'Content-Type': 'text/plain; charset=utf-8',
+            'Content-Encoding': 'gzip',
+            'Connection': 'keep-alive',
+        }
+        if token:
+            self.headers['Authorization'] = f"Token {token}"
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.spool_dir = spool_dir
+        self.timeout = timeout
+        self.compresslevel = compresslevel
+
+        self._conn = None
+        self._pending = []
+        self._pending_lines = 0
+        self._last_flush = time.monotonic()
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+        self._start = time.monotonic()
+
+        self.points = 0
+        self.batches = 0
+        self.bytes_raw = 0
+        self.bytes_wire = 0
+        self.retries = 0
+        self.spooled = 0
+        self.rejected = 0
+        self.errors = []
+
+        # Background flusher so a slow scan still delivers within flush_interval
+        self._flusher = threading.Thread(target=self._flush_loop, daemon=True)
+        self._flusher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        return cls(self.host, self.port, timeout=self.timeout)
+
+    def write(self, text):
+        """Buffers one or more newline-terminated lines and sends a batch when it is full."""
+        if not text:
+            return
+        with self._lock:
+            self._pending.append(text)
+            self._pending_lines += text.count('\n')
+            if self._pending_lines >= self.batch_size:
+                self._flush_locked()
+
+    def _flush_loop(self):
+        while not self._closed.wait(min(1.0, self.flush_interval)):
+            with self._lock:
+                if self._pending and time.monotonic() - self._last_flush >= self.flush_interval:
+                    self._flush_locked()
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        text = ''.join(self._pending)
+        lines = self._pending_lines
+        self._pending.clear()
+        self._pending_lines = 0
+        # scandir hands back undecodable names as surrogate escapes; send their original bytes
+        raw = text.encode('utf-8', 'surrogateescape')
+        body = gzip.compress(raw, compresslevel=self.compresslevel)
+        outcome = self._send(body)
+        if outcome == SENT:
+            self.points += lines
+            self.batches += 1
+            self.bytes_raw += len(raw)
+        elif outcome == REJECTED:
+            self._reject(body)
+        else:
+            self._spool(body)
+
+    def _post(self, body):
+        """Sends one request on the kept-alive connection; returns (status, reason, retry_after)."""
+        if self._conn is None:
+            self._conn = self._connect()
+        self._conn.request('POST', self.request_path, body=body, headers=self.headers)
+        response = self._conn.getresponse()
+        payload = response.read()  # drain so the connection can be reused
+        if response.getheader('Connection', '').lower() == 'close':
+            self._conn.close()
+            self._conn = None
+        retry_after = response.getheader('Retry-After')
+        reason = payload.decode('utf-8', 'replace').strip() or response.reason
+        return response.status, reason, retry_after
+
+    def _send(self, body):
+        delay = self.backoff
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                status, reason, retry_after = self._post(body)
+            except (OSError, http.client.HTTPException) as e:
+                status, reason = None, str(e)
+                if self._conn is not None:
+                    self._conn.close()
+                    self._conn = None
+            self.bytes_wire += len(body)
+            if status is not None and 200 <= status < 300:
+                return SENT
+            if status is not None and 400 <= status < 500 and status != 429:
+                # Malformed points or auth errors will not succeed on retry
+                self.errors.append(f"HTTP {status}: {reason}")
+                return REJECTED
+            if attempt == self.max_retries:
+                self.errors.append(f"giving up after {attempt + 1} attempts: {status or ''} {reason}")
+                return FAILED
+            self.retries += 1
+            wait = delay
+            if retry_after and retry_after.isdigit():
+                wait = max(wait, int(retry_after))
+            time.sleep(min(wait, self.max_backoff))
+            delay *= 2
+        return FAILED
+
+    def _store(self, directory, body):
+        os.makedirs(directory, exist_ok=True)
+        name = os.path.join(directory, f"batch-{time.time_ns()}.lp.gz")
+        with open(name + '.tmp', 'wb') as f:
+            f.write(body)
+        os.replace(name + '.tmp', name)
+
+    def _spool(self, body):
+        if not self.spool_dir:
+            print(f"Dropped batch of {len(body)} bytes: {self.errors[-1] if self.errors else ''}",
+                  file=sys.stderr)
+            return
+        self._store(self.spool_dir, body)
+        self.spooled += 1
+
+    def _reject(self, body):
+        self.rejected += 1
+        print(f"Rejected batch of {len(body)} bytes: {self.errors[-1] if self.errors else ''}", file=sys.stderr)
+        if self.spool_dir:
+            self._store(os.path.join(self.spool_dir, 'rejected'), body)
+
+    def replay_spool(self):
+        """
+        Resends spooled batches, oldest first, and deletes each one once accepted.
+
+        A batch the server rejects is moved to spool_dir/rejected and the replay
+        goes on with the next one; it stops at the first batch that fails for
+        any other reason, since the server is evidently still unavailable.
+
+        Returns:
+            int: Number of batches delivered.
+        """
+        if not self.spool_dir or not os.path.isdir(self.spool_dir):
+            return 0
+        delivered = 0
+        with self._lock:
+            for name in sorted(os.listdir(self.spool_dir)):
+                if not name.endswith('.lp.gz'):
+                    continue
+                path = os.path.join(self.spool_dir, name)
+                with open(path, 'rb') as f:
+                    body = f.read()
+                outcome = self._send(body)
+                if outcome == FAILED:
+                    break
+                if outcome == REJECTED:
+                    rejected = os.path.join(self.spool_dir, 'rejected')
+                    os.makedirs(rejected, exist_ok=True)
+                    os.replace(path, os.path.join(rejected, name))
+                    self.rejected += 1
+                    continue
+                os.remove(path)
+                delivered += 1
+                self.batches += 1
+        return delivered
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def stats(self):
+        elapsed = time.monotonic() - self._start
+        return {
+            'points': self.points,
+            'batches': self.batches,
+            'bytes_raw': self.bytes_raw,
+            'bytes_wire': self.bytes_wire,
+            'retries': self.retries,
+            'spooled': self.spooled,
+            'rejected': self.rejected,
+            'elapsed': elapsed,
+            'points_per_sec': self.points / elapsed if elapsed else 0.0,
+        }
+
+    def format_report(self):
+        s = self.stats()
+        ratio = s['bytes_raw'] / s['bytes_wire'] if s['bytes_wire'] else 0.0
+        return (f"influx writer: {s['points']} points in {s['batches']} batches, "
+                f"{s['points_per_sec']:.0f} points/s, {s['bytes_wire']} bytes on the wire "
+                f"({ratio:.1f}x compression), {s['retries']} retries, {s['spooled']} spooled, "
+                f"{s['rejected']} rejected")
@@ -0,0 +1,249 @@
+import itertools
+import sys
+
+# Escaping follows the InfluxDB line protocol spec and Telegraf's serializer:
+# measurement names escape commas and spaces, tag keys/values and field keys
+# also escape "=", and all of them turn tabs, newlines, form feeds and carriage
+# returns into escape sequences so a value can never break the line.
+_NAME_ESCAPES = str.maketrans({
+    ',': '\\,', ' ': '\\ ',
+    '\t': '\\t', '\n': '\\n', '\f': '\\f', '\r': '\\r',
+})
+_KEY_ESCAPES = str.maketrans({
+    ',': '\\,', ' ': '\\ ', '=': '\\=',
+    '\t': '\\t', '\n': '\\n', '\f': '\\f', '\r': '\\r',
+})
+_STRING_ESCAPES = str.maketrans({'\\': '\\\\', '"': '\\"'})
+
+# Tag values repeat heavily (owners, types, extensions), so escaped forms are memoized
+_TAG_CACHE_LIMIT = 100000
+
+
+def escape_measurement(name):
+    return name.translate(_NAME_ESCAPES)
+
+
+def escape_key(value):
+    """Escapes a tag key, tag value or field key."""
+    value = value.translate(_KEY_ESCAPES)
+    # A trailing backslash would escape the separator that follows it
+    return value.rstrip('\\') if value.endswith('\\') else value
+
+
+def escape_string_field(value):
+    return '"' + value.translate(_STRING_ESCAPES) + '"'
+
+
+def format_field_value(value):
+    """Formats a Python value as a line protocol field value (bool before int, ints get an i suffix)."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, int):
+        return f'{value}i'
+    if isinstance(value, float):
+        return repr(value)
+    if isinstance(value, str):
+        return escape_string_field(value)
+    raise TypeError(f"Unsupported field type {type(value).__name__}")
+
+
+class LineProtocolEncoder:
+    """
+    Encodes points into a reusable text buffer.
+
+    Lines are appended to an internal list of string chunks which is joined only
+    when the buffer is read or written out, and cleared (not reallocated) after.
+    Measurement names and tag/field keys are escaped once per batch, and escaped
+    tag values are cached, so the per-line work is mostly string concatenation.
+
+    Tags with empty values and fields that are None are skipped, since InfluxDB
+    rejects both; a point left without any field raises ValueError.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._tag_cache = {}
+        self._key_cache = {}
+        self.lines = 0
+
+    def __len__(self):
+        return self.lines
+
+    def _key(self, key):
+        escaped = self._key_cache.get(key)
+        if escaped is None:
+            escaped = self._key_cache[key] = escape_key(key)
+        return escaped
+
+    def _tag_value(self, value):
+        escaped = self._tag_cache.get(value)
+        if escaped is None:
+            if len(self._tag_cache) >= _TAG_CACHE_LIMIT:
+                self._tag_cache.clear()
+            escaped = self._tag_cache[value] = escape_key(str(value))
+        return escaped
+
+    def add(self, measurement, tags, fields, timestamp=None):
+        """
+        Appends one point.
+
+        Args:
+            measurement (str): Measurement name.
+            tags (dict): Tag key -> value; written in the order given.
+            fields (dict): Field key -> int, float, bool or str.
+            timestamp (int): Timestamp in the write precision (nanoseconds by default).
+        """
+        self._append(escape_measurement(measurement), tags.items(), fields.items(), timestamp)
+
+    def _append(self, prefix, tag_items, field_items, timestamp):
+        tags = ''.join([f',{self._key(k)}={self._tag_value(v)}' for k, v in tag_items if v is not None and v != ''])
+        fields = ','.join([f'{self._key(k)}={format_field_value(v)}' for k, v in field_items if v is not None])
+        if not fields:
+            raise ValueError(f"Point for {prefix} has no fields")
+        if timestamp is None:
+            self._chunks.append(f'{prefix}{tags} {fields}\n')
+        else:
+            self._chunks.append(f'{prefix}{tags} {fields} {timestamp}\n')
+        self.lines += 1
+
+    def add_batch(self, measurement, records):
+        """
+        Appends many points of one measurement.
+
+        Args:
+            measurement (str): Measurement name.
+            records (iterable): (tags, fields, timestamp) tuples.
+        """
+        prefix = escape_measurement(measurement)
+        for tags, fields, timestamp in records:
+            self._append(prefix, tags.items(), fields.items(), timestamp)
+
+    def _tag_column(self, key, column):
+        # Escape every distinct value once, then map the column through the table
+        head = f',{self._key(key)}='
+        table = {}
+        for value in set(column):
+            table[value] = '' if value is None or value == '' else head + self._tag_value(value)
+        return list(map(table.__getitem__, column))
+
+    @staticmethod
+    def _field_column(key, column, sep):
+        head = f'{sep}{key}='
+        types = set(map(type, column))
+        if types == {int}:
+            return [f'{head}{v}i' for v in column]
+        if types == {float}:
+            return [head + repr(v) for v in column]
+        if types == {str}:
+            return [f'{head}"{v.translate(_STRING_ESCAPES)}"' for v in column]
+        return [head + format_field_value(v) for v in column]
+
+    def add_columns(self, measurement, tags, fields, timestamps=None):
+        """
+        Appends points given as columns of equal length.
+
+        The work is done column by column (each distinct tag value is escaped
+        once and every field column is formatted with a single type check), and
+        the rows are only stitched together at the end.
+
+        Args:
+            measurement (str): Measurement name.
+            tags (dict): Tag key -> sequence of values (written in sorted key order).
+            fields (dict): Field key -> sequence of values.
+            timestamps (sequence): One timestamp per row, or None to let the server assign it.
+        """
+        if not fields:
+            raise ValueError(f"Points for {measurement} have no fields")
+        field_keys = list(fields)
+        if any(None in fields[k] for k in field_keys):
+            # Rows with missing fields need per-row separators; take the slow path
+            rows = len(fields[field_keys[0]])
+            ts = timestamps if timestamps is not None else [None] * rows
+            tag_keys = sorted(tags)
+            prefix = escape_measurement(measurement)
+            for i in range(rows):
+                self._append(prefix, [(k, tags[k][i]) for k in tag_keys],
+                             [(k, fields[k][i]) for k in field_keys], ts[i])
+            return
+
+        rows = len(fields[field_keys[0]])
+        columns = [itertools.repeat(escape_measurement(measurement), rows)]
+        columns += [self._tag_column(k, tags[k]) for k in sorted(tags)]
+        for n, key in enumerate(field_keys):
+            columns.append(self._field_column(self._key(key), fields[key], ' ' if n == 0 else ','))
+        if timestamps is not None:
+            columns.append([f' {t}\n' for t in timestamps])
+        else:
+            columns.append(itertools.repeat('\n', rows))
+        self._chunks.append(''.join(map(''.join, zip(*columns))))
+        self.lines += rows
+
+    def getvalue(self):
+        if len(self._chunks) > 1:
+            joined = ''.join(self._chunks)
+            self._chunks.clear()
+            self._chunks.append(joined)
+        return self._chunks[0] if self._chunks else ''
+
+    def getbytes(self):
+        # Undecodable file names come back as the original bytes
+        return self.getvalue().encode('utf-8', 'surrogateescape')
+
+    def write_to(self, out):
+        """Writes the buffered lines to a text stream and empties the buffer."""
+        out.write(self.getvalue())
+        self.clear()
+
+    def clear(self):
+        self._chunks.clear()
+        self.lines = 0
+
+
+def encode_line(measurement, tags, fields, timestamp=None):
+    """Convenience wrapper that encodes a single point and returns the line."""
+    encoder = LineProtocolEncoder()
+    encoder.add(measurement, tags, fields, timestamp)
+    return encoder.getvalue()
+
+
+# (measurement, tags, fields, timestamp, expected line) conformance cases
+CONFORMANCE_CASES = [
+    ("cpu", {"host": "a"}, {"value": 1.5}, 1, 'cpu,host=a value=1.5 1\n'),
+    ("cpu", {}, {"count": 3, "ok": True, "name": "x"}, None, 'cpu count=3i,ok=true,name="x"\n'),
+    ("my measurement,x", {}, {"v": 1}, None, 'my\\ measurement\\,x v=1i\n'),
+    ("m=eq", {}, {"v": 1}, None, 'm=eq v=1i\n'),
+    ("m", {"path": "/mnt/c/Program Files/a,b=c"}, {"v": 1}, None,
+     'm,path=/mnt/c/Program\\ Files/a\\,b\\=c v=1i\n'),
+    ("m", {"k": "tab\there"}, {"v": 1}, None, 'm,k=tab\\there v=1i\n'),
+    ("m", {"k": "new\nline\r"}, {"v": 1}, None, 'm,k=new\\nline\\r v=1i\n'),
+    ("m", {"k": "trailing\\"}, {"v": 1}, None, 'm,k=trailing v=1i\n'),
+    ("m", {"k": 'quote"d'}, {"v": 1}, None, 'm,k=quote"d v=1i\n'),
+    ("m", {"tag key": "v"}, {"field key=": 1}, None, 'm,tag\\ key=v field\\ key\\==1i\n'),
+    ("m", {"empty": ""}, {"v": 1}, None, 'm v=1i\n'),
+    ("m", {}, {"s": 'say "hi" \\ bye'}, None, 'm s="say \\"hi\\" \\\\ bye"\n'),
+    ("m", {}, {"s": "multi\nline"}, None, 'm s="multi\nline"\n'),
+    ("m", {}, {"f": 0.1, "n": -7, "b": False, "none": None}, 5, 'm f=0.1,n=-7i,b=false 5\n'),
+]
+
+
+def check_conformance():
+    """Runs CONFORMANCE_CASES and returns the list of failures."""
+    failures = []
+    for measurement, tags, fields, timestamp, expected in CONFORMANCE_CASES:
+        got = encode_line(measurement, tags, fields, timestamp)
+        if got != expected:
+            failures.append((measurement, tags, fields, expected, got))
+    try:
+        encode_line("m", {"k": "v"}, {"none": None})
+        failures.append(("m", {"k": "v"}, {"none": None}, "ValueError", "no error"))
+    except ValueError:
+        pass
+    return failures
+
+
+if __name__ == "__main__":
+    failures = check_conformance()
+    for measurement, tags, fields, expected, got in failures:
+        print(f"FAIL {measurement!r} {tags!r} {fields!r}\n  expected {expected!r}\n  got      {got!r}")
+    print(f"{len(CONFORMANCE_CASES) + 1 - len(failures)}/{len(CONFORMANCE_CASES) + 1} conformance checks passed")
+    sys.exit(1 if failures else 0)
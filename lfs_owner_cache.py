@@ -0,0 +1,130 @@
+import grp
+import pwd
+
+
+def unknown_name(_id):
+    """Fallback that mimics `stat -c %U/%G`, which prints UNKNOWN for unmapped ids."""
+    return "UNKNOWN"
+
+
+class OwnerResolver:
+    """
+    Caches uid -> user name and gid -> group name lookups for the lifetime of a scan.
+
+    pwd.getpwuid/grp.getgrgid go through NSS on every call, which means an LDAP or
+    SSSD round trip per file on directory-backed accounts. A scan only ever sees a
+    handful of distinct owners, so every id is resolved once and then served from
+    a dict. Ids that NSS does not know resolve to their numeric string, the same
+    way `ls -l` shows them, unless another fallback is given.
+
+    The resolver is a plain picklable object: preload it once in the parent and
+    hand it to worker processes (e.g. through a Pool initializer) so the workers
+    start with a warm cache.
+    """
+
+    def __init__(self, users=None, groups=None, fallback=str):
+        self.fallback = fallback
+        self.users = dict(users or {})
+        self.groups = dict(groups or {})
+        self.primary_gids = {}
+        self.hits = 0
+        self.misses = 0
+        self.unresolved = 0
+
+    def preload(self, uids=None, gids=None):
+        """
+        Warms the cache, either from the full passwd/group databases or from known ids.
+
+        Args:
+            uids (iterable): Specific uids to resolve. When both uids and gids are None
+                the whole passwd and group databases are enumerated instead.
+            gids (iterable): Specific gids to resolve.
+
+        Returns:
+            OwnerResolver: self, so the call can be chained.
+        """
+        if uids is None and gids is None:
+            # getpwall/getgrall may return only local accounts when the
+            # directory service disables enumeration; misses are still looked up lazily
+            for entry in pwd.getpwall():
+                self.users.setdefault(entry.pw_uid, entry.pw_name)
+                self.primary_gids.setdefault(entry.pw_uid, entry.pw_gid)
+            for entry in grp.getgrall():
+                self.groups.setdefault(entry.gr_gid, entry.gr_name)
+            return self
+        for uid in uids or ():
+            if uid not in self.users:
+                self.users[uid] = self._lookup_user(uid)
+        for gid in gids or ():
+            if gid not in self.groups:
+                self.groups[gid] = self._lookup_group(gid)
+        return self
+
+    def _lookup_user(self, uid):
+        try:
+            entry = pwd.getpwuid(uid)
+            self.primary_gids[uid] = entry.pw_gid
+            return entry.pw_name
+        except KeyError:
+            self.unresolved += 1
+            return self.fallback(uid)
+
+    def _lookup_group(self, gid):
+        try:
+            return grp.getgrgid(gid).gr_name
+        except KeyError:
+            self.unresolved += 1
+            return self.fallback(gid)
+
+    def user(self, uid):
+        name = self.users.get(uid)
+        if name is not None:
+            self.hits += 1
+            return name
+        self.misses += 1
+        name = self.users[uid] = self._lookup_user(uid)
+        return name
+
+    def group(self, gid):
+        name = self.groups.get(gid)
+        if name is not None:
+            self.hits += 1
+            return name
+        self.misses += 1
+        name = self.groups[gid] = self._lookup_group(gid)
+        return name
+
+    def primary_gid(self, uid):
+        """Returns the login group of uid, or None when the uid is unknown to NSS."""
+        self.user(uid)
+        return self.primary_gids.get(uid)
+
+    def stats(self):
+        """
+        Returns the cache counters for the scan report.
+
+        Returns:
+            dict: hits, misses, unresolved ids and cached user/group counts.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'unresolved': self.unresolved,
+            'users': len(self.users),
+            'groups': len(self.groups),
+        }
+
+    def merge_stats(self, other):
+        """Adds the counters of a worker's resolver (or its stats() dict) to this one."""
+        if isinstance(other, OwnerResolver):
+            other = other.stats()
+        self.hits += other['hits']
+        self.misses += other['misses']
+        self.unresolved += other['unresolved']
+
+    def format_report(self):
+        s = self.stats()
+        lookups = s['hits'] + s['misses']
+        ratio = (s['hits'] / lookups * 100) if lookups else 0.0
+        return (f"owner cache: {s['hits']} hits, {s['misses']} misses ({ratio:.1f}% hit rate), "
+                f"{s['unresolved']} unresolved ids, {s['users']} users / {s['groups']} groups cached")
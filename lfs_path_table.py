@@ -0,0 +1,204 @@
+import argparse
+import array
+import os
+import stat
+import sys
+import time
+
+import numpy as np
+
+
+class NameBuffer:
+    """Basenames packed into one bytearray, addressed by index through an offsets array."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array.array('Q', [0])
+
+    def append(self, name):
+        self.data += name.encode('utf-8', 'surrogateescape')
+        self.offsets.append(len(self.data))
+        return len(self.offsets) - 2
+
+    def __getitem__(self, index):
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode('utf-8', 'surrogateescape')
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+
+class PathTable:
+    """
+    A scan result that stores every directory once and every file as (parent, basename).
+
+    Directories form a parent-pointer table (dir 0 is the scan root, its
+    parent is -1); files keep the id of their directory and their basename.
+    Names are packed into NameBuffers and the stat fields live in parallel
+    array.array columns, so a file costs its basename plus ~40 bytes instead of
+    a full path string and a dict. Full paths are rebuilt only when asked for,
+    and per-directory or per-prefix totals are computed on the id columns.
+    """
+
+    def __init__(self, root):
+        self.root = root.rstrip('/') or '/'
+        self.dir_parent = array.array('i')
+        self.dir_names = NameBuffer()
+        self.file_parent = array.array('i')
+        self.file_names = NameBuffer()
+        self.size = array.array('q')
+        self.mtime = array.array('q')
+        self.mode = array.array('I')
+        self.uid = array.array('I')
+        self.gid = array.array('I')
+        self.errors = 0
+        self._dir_paths = {}
+
+    def add_dir(self, parent, name):
+        self.dir_parent.append(parent)
+        self.dir_names.append(name)
+        return len(self.dir_parent) - 1
+
+    def add_file(self, parent, name, st):
+        self.file_parent.append(parent)
+        self.file_names.append(name)
+        self.size.append(st.st_size)
+        self.mtime.append(st.st_mtime_ns)
+        self.mode.append(st.st_mode)
+        self.uid.append(st.st_uid)
+        self.gid.append(st.st_gid)
+
+    @classmethod
+    def scan(cls, root, onerror=None):
+        """Walks root with scandir (no symlinks followed) and returns the filled table."""
+        table = cls(root)
+        stack = [(table.add_dir(-1, ''), table.root)]
+        while stack:
+            dir_id, directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        try:
+                            st = entry.stat(follow_symlinks=False)
+                        except OSError as e:
+                            table.errors += 1
+                            if onerror is not None:
+                                onerror(e)
+                            continue
+                        if stat.S_ISDIR(st.st_mode):
+                            stack.append((table.add_dir(dir_id, entry.name), entry.path))
+                        else:
+                            table.add_file(dir_id, entry.name, st)
+            except OSError as e:
+                table.errors += 1
+                if onerror is not None:
+                    onerror(e)
+        return table
+
+    def dir_path(self, dir_id):
+        """Rebuilds a directory's path, caching it so siblings share the work."""
+        path = self._dir_paths.get(dir_id)
+        if path is None:
+            parent = self.dir_parent[dir_id]
+            if parent < 0:
+                path = self.root
+            else:
+                parent_path = self.dir_path(parent)
+                path = ('' if parent_path == '/' else parent_path) + '/' + self.dir_names[dir_id]
+            self._dir_paths[dir_id] = path
+        return path
+
+    def file_path(self, index):
+        directory = self.dir_path(self.file_parent[index])
+        return ('' if directory == '/' else directory) + '/' + self.file_names[index]
+
+    def iter_files(self):
+        """Yields (path, index) for every file; use the index to read the stat columns."""
+        for index in range(len(self.file_parent)):
+            yield self.file_path(index), index
+
+    def dir_depths(self):
+        """Depth of every directory below the root (root = 0); parents always precede children."""
+        parent = np.frombuffer(self.dir_parent, dtype=np.int32)
+        depth = np.zeros(len(parent), dtype=np.int32)
+        for dir_id in range(1, len(parent)):
+            depth[dir_id] = depth[parent[dir_id]] + 1
+        return depth
+
+    def subtree_totals(self):
+        """
+        Total file size and count below every directory.
+
+        Returns:
+            tuple: (size, count) numpy arrays indexed by directory id.
+        """
+        parent = np.frombuffer(self.dir_parent, dtype=np.int32)
+        file_parent = np.frombuffer(self.file_parent, dtype=np.int32)
+        size = np.zeros(len(parent), dtype=np.int64)
+        np.add.at(size, file_parent, np.frombuffer(self.size, dtype=np.int64))  # exact, unlike float weights
+        count = np.bincount(file_parent, minlength=len(parent)).astype(np.int64)
+        # Ids are assigned when a directory is found, so children always have larger ids
+        for dir_id in range(len(parent) - 1, 0, -1):
+            size[parent[dir_id]] += size[dir_id]
+            count[parent[dir_id]] += count[dir_id]
+        return size, count
+
+    def prefix_totals(self, depth):
+        """
+        Sums file sizes and counts by ancestor directory at the given depth below the root.
+
+        Files in shallower directories count towards their own directory.
+
+        Returns:
+            dict: directory path -> (size, count)
+        """
+        parent = np.frombuffer(self.dir_parent, dtype=np.int32)
+        depths = self.dir_depths()
+        ancestor = np.arange(len(parent), dtype=np.int32)
+        for dir_id in range(1, len(parent)):
+            if depths[dir_id] > depth:
+                ancestor[dir_id] = ancestor[parent[dir_id]]
+        file_group = ancestor[np.frombuffer(self.file_parent, dtype=np.int32)]
+        size = np.zeros(len(parent), dtype=np.int64)
+        np.add.at(size, file_group, np.frombuffer(self.size, dtype=np.int64))
+        count = np.bincount(file_group, minlength=len(parent))
+        return {self.dir_path(int(d)): (int(size[d]), int(count[d])) for d in np.flatnonzero(count)}
+
+    def nbytes(self, paths_only=False):
+        """Approximate memory held by the table's buffers, or only by the path structure."""
+        buffers = [self.dir_parent, self.file_parent, self.dir_names.offsets, self.file_names.offsets]
+        if not paths_only:
+            buffers += [self.size, self.mtime, self.mode, self.uid, self.gid]
+        return (sum(b.itemsize * len(b) for b in buffers)
+                + len(self.dir_names.data) + len(self.file_names.data))
+
+    def __len__(self):
+        return len(self.file_parent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan into a path-interned table and print per-prefix totals")
+    parser.add_argument("path", help="Directory to scan")
+    parser.add_argument("--depth", type=int, default=1, help="Aggregate by ancestor at this depth below the root")
+    parser.add_argument("--compare", action="store_true",
+                        help="Also build the get_all_file_paths list and compare memory")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    table = PathTable.scan(args.path)
+    scanned = time.perf_counter() - start
+    for directory, (size, count) in sorted(table.prefix_totals(args.depth).items()):
+        print(f"{size}\t{count}\t{directory}")
+    print(f"{len(table)} files in {len(table.dir_parent)} directories, {table.nbytes() / 1e6:.1f} MB, "
+          f"scanned in {scanned:.2f}s", file=sys.stderr)
+
+    if args.compare:
+        from lfs_filestat_parallel import get_all_file_paths
+        paths = get_all_file_paths(args.path)
+        list_bytes = sys.getsizeof(paths) + sum(sys.getsizeof(p) for p in paths)
+        print(f"get_all_file_paths: {len(paths)} paths, {list_bytes / 1e6:.1f} MB; the table's path structure "
+              f"is {table.nbytes(paths_only=True) / 1e6:.1f} MB ({list_bytes / table.nbytes(paths_only=True):.1f}x "
+              f"smaller)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
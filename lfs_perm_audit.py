@@ -0,0 +1,152 @@
+import argparse
+import errno
+import json
+import os
+import pwd
+import stat
+import sys
+import time
+
+from lfs_mode_bits import mode_allows
+
+
+class PermissionAudit:
+    """
+    Finds inaccessible paths with one directory read per directory and no file opens.
+
+    safe_os_walk listed every subdirectory a second time and open()ed every
+    file to see whether it was readable. Here each directory is read once with
+    os.scandir and its entries are lstat'ed; readability is decided from the
+    mode bits for the audited uid and groups, and anything the walk itself
+    cannot do (EACCES, ENOENT races, I/O errors) is reported from the OSError
+    it raised. Every problem is passed to report() as a dict:
+
+        path, kind, source ("mode" or "walk"), errno, error, mode, uid, gid
+
+    kind is one of file_unreadable, dir_unreadable, dir_untraversable,
+    list_denied, list_failed, stat_failed. Directories the audited user cannot
+    read or enter are not descended into, since nothing below them is reachable.
+    """
+
+    def __init__(self, uid=None, gids=None, report=None):
+        self.uid = os.geteuid() if uid is None else uid
+        self.gids = set(os.getgroups()) | {os.getegid()} if gids is None else set(gids)
+        self.report = report
+        self.counts = {}
+        self.dirs_read = 0
+        self.entries = 0
+
+    def _problem(self, path, kind, source, st=None, error=None):
+        self.counts[kind] = self.counts.get(kind, 0) + 1
+        if self.report is None:
+            return
+        record = {'path': path, 'kind': kind, 'source': source,
+                  'errno': errno.errorcode.get(error.errno) if error is not None and error.errno else None,
+                  'error': error.strerror if error is not None else None,
+                  'mode': format(stat.S_IMODE(st.st_mode), '04o') if st is not None else None,
+                  'uid': st.st_uid if st is not None else None,
+                  'gid': st.st_gid if st is not None else None}
+        self.report(record)
+
+    def _enterable(self, path, st):
+        """Checks a directory's r and x bits; reports and returns False if the walk must stop there."""
+        if not mode_allows(st, self.uid, self.gids, 1):
+            self._problem(path, 'dir_untraversable', 'mode', st)
+            return False
+        if not mode_allows(st, self.uid, self.gids, 4):
+            self._problem(path, 'dir_unreadable', 'mode', st)
+            return False
+        return True
+
+    def run(self, root):
+        """
+        Walks root and yields (path, stat_result) for every entry that could be stat'ed.
+
+        Problems are reported as they are found; the counters are complete once
+        the generator is exhausted.
+        """
+        try:
+            st = os.lstat(root)
+        except OSError as e:
+            self._problem(root, 'stat_failed', 'walk', error=e)
+            return
+        self.entries += 1
+        yield root, st
+        if not stat.S_ISDIR(st.st_mode) or not self._enterable(root, st):
+            return
+
+        stack = [(root, st)]
+        while stack:
+            directory, dst = stack.pop()
+            try:
+                it = os.scandir(directory)
+            except PermissionError as e:
+                # ACLs, LSMs or a mismatch between the audited and the running user
+                self._problem(directory, 'list_denied', 'walk', dst, e)
+                continue
+            except OSError as e:
+                self._problem(directory, 'list_failed', 'walk', dst, e)
+                continue
+            self.dirs_read += 1
+            with it:
+                while True:
+                    try:
+                        entry = next(it)
+                    except StopIteration:
+                        break
+                    except OSError as e:
+                        self._problem(directory, 'list_failed', 'walk', dst, e)
+                        break
+                    try:
+                        st = entry.stat(follow_symlinks=False)
+                    except OSError as e:
+                        self._problem(entry.path, 'stat_failed', 'walk', error=e)
+                        continue
+                    self.entries += 1
+                    yield entry.path, st
+                    if stat.S_ISDIR(st.st_mode):
+                        if self._enterable(entry.path, st):
+                            stack.append((entry.path, st))
+                    elif stat.S_ISREG(st.st_mode) and not mode_allows(st, self.uid, self.gids, 4):
+                        self._problem(entry.path, 'file_unreadable', 'mode', st)
+
+    def format_report(self):
+        problems = ", ".join(f"{kind}={count}" for kind, count in sorted(self.counts.items())) or "none"
+        return (f"{self.entries} entries, {self.dirs_read} directory reads, 0 file opens; "
+                f"problems: {problems}")
+
+
+def json_lines_reporter(out):
+    """Returns a report callback that writes each problem as one JSON line."""
+    def report(record):
+        out.write(json.dumps(record) + "\n")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report unreadable and untraversable paths without opening files")
+    parser.add_argument("path", help="Directory to audit")
+    parser.add_argument("--user", help="Audit for this user name or uid instead of the current user")
+    parser.add_argument("-o", "--errors", help="Write the JSON error stream here instead of stdout")
+    args = parser.parse_args()
+
+    uid = gids = None
+    if args.user:
+        entry = pwd.getpwuid(int(args.user)) if args.user.isdigit() else pwd.getpwnam(args.user)
+        uid, gids = entry.pw_uid, os.getgrouplist(entry.pw_name, entry.pw_gid)
+
+    out = open(args.errors, 'w', encoding='utf-8', errors='surrogateescape') if args.errors else sys.stdout
+    try:
+        audit = PermissionAudit(uid, gids, report=json_lines_reporter(out))
+        start = time.perf_counter()
+        for _ in audit.run(args.path):
+            pass
+        elapsed = time.perf_counter() - start
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"{audit.format_report()} in {elapsed:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from lfs_columnar import read_snapshot
+
+
+class PrefixIndex:
+    """
+    Subtree totals of a saved scan from two binary searches.
+
+    The snapshot's paths are sorted bytewise with a running (inclusive) sum of
+    their sizes. Every path below directory X lies in the range
+    [X + "/", X + "0"), since "0" is the character after "/", so a subtree
+    total is the difference of the running sum at the two ends and the entry
+    count is the distance between them. The searches compare raw UTF-8 bytes
+    straight from the Arrow buffers, which load() memory-maps, so a lookup
+    does not decode any path strings.
+    """
+
+    def __init__(self, paths, cum_size):
+        paths = paths.combine_chunks() if isinstance(paths, pa.ChunkedArray) else paths
+        self.paths = paths.cast(pa.large_string())
+        _, offsets, data = self.paths.buffers()
+        self.offsets = np.frombuffer(offsets, dtype=np.int64)[self.paths.offset:]
+        self.data = memoryview(data) if data is not None else memoryview(b'')
+        self.cum_size = np.asarray(cum_size, dtype=np.int64)
+
+    @classmethod
+    def build(cls, table):
+        """Sorts a snapshot table (path and size columns) into an index."""
+        order = pc.sort_indices(table.column('path'))
+        paths = table.column('path').take(order)
+        sizes = table.column('size').take(order).to_numpy()
+        return cls(paths, np.cumsum(sizes, dtype=np.int64))
+
+    def save(self, path):
+        table = pa.table({'path': self.paths, 'cum_size': self.cum_size})
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=len(table) or None)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-maps an index written by save()."""
+        table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+        return cls(table.column('path'), table.column('cum_size').to_numpy())
+
+    def _key(self, i):
+        # Only the ~24 probed paths are copied out of the buffer, as bytes
+        return bytes(self.data[int(self.offsets[i]):int(self.offsets[i + 1])])
+
+    def _bisect_left(self, key):
+        lo, hi = 0, len(self.cum_size)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def _range_total(self, lo, hi):
+        if hi <= lo:
+            return 0
+        return int(self.cum_size[hi - 1] - (self.cum_size[lo - 1] if lo else 0))
+
+    def subtree(self, directory):
+        """
+        Returns (size, count) of every indexed entry below directory.
+
+        A path that is itself an indexed file gives that file's size and a count of 1.
+        """
+        directory = directory.rstrip('/')
+        prefix = directory.encode('utf-8', 'surrogateescape')
+        lo = self._bisect_left(prefix + b'/')
+        hi = self._bisect_left(prefix + b'0')
+        if hi == lo and directory:
+            exact = self._bisect_left(prefix)
+            if exact < len(self.cum_size) and self._key(exact) == prefix:
+                return self._range_total(exact, exact + 1), 1
+        return self._range_total(lo, hi), hi - lo
+
+    def __len__(self):
+        return len(self.cum_size)
+
+
+def open_index(path):
+    """Loads a saved index, or builds one in memory from a columnar snapshot."""
+    try:
+        schema = pa.ipc.open_file(pa.memory_map(path, 'r')).schema
+    except pa.ArrowInvalid:
+        schema = None
+    if schema is not None and 'cum_size' in schema.names:
+        return PrefixIndex.load(path)
+    return PrefixIndex.build(read_snapshot(path, columns=['path', 'size']))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Directory sizes from a saved scan via a sorted prefix index")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Build an index file from a columnar snapshot")
+    build.add_argument("snapshot", help="Snapshot written by lfs_columnar (.arrow or .parquet)")
+    build.add_argument("index", help="Index file to write")
+    query = sub.add_parser("query", help="Print size and entry count of each directory")
+    query.add_argument("index", help="Index file, or a snapshot to index in memory")
+    query.add_argument("directories", nargs="+")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "build":
+        index = PrefixIndex.build(read_snapshot(args.snapshot, columns=['path', 'size']))
+        index.save(args.index)
+        print(f"Indexed {len(index)} entries in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+        return
+
+    index = open_index(args.index)
+    loaded = time.perf_counter() - start
+    for directory in args.directories:
+        start = time.perf_counter()
+        size, count = index.subtree(directory)
+        elapsed = time.perf_counter() - start
+        print(f"{size}\t{count}\t{directory}")
+        print(f"{directory}: {elapsed * 1000:.3f} ms", file=sys.stderr)
+    print(f"{len(index)} entries, opened in {loaded * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
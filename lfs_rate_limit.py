@@ -0,0 +1,137 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    A metadata-operation budget shared by every worker of a scan.
+
+    Each scandir or stat takes one token; tokens refill at `rate` per second up
+    to `burst`. Workers that find the bucket empty sleep until their token is
+    due, outside the lock, so throttling costs no CPU.
+
+    The rate adapts to the filesystem: workers report how long each stat took
+    (observe), and once per `window` seconds the mean latency is compared to the
+    target. Above it, the rate is cut by `backoff`; comfortably below it, the rate
+    grows back by 5% of max_rate at a time. Without an explicit latency_target,
+    the target is `latency_factor` times the lowest window mean seen so far, i.e.
+    "back off when stat gets three times slower than it was when idle".
+    """
+
+    def __init__(self, rate, burst=None, min_rate=None, latency_target=None, latency_factor=3.0,
+                 backoff=0.7, window=1.0):
+        """
+        Args:
+            rate (float): Maximum operations per second (the budget).
+            burst (float): Bucket size; defaults to a tenth of a second's worth, at least 1.
+            min_rate (float): Floor for the adaptive rate; defaults to 5% of rate.
+            latency_target (float): Mean stat latency in seconds above which the rate is cut.
+            latency_factor (float): Target as a multiple of the best observed latency when
+                latency_target is not given.
+            backoff (float): Factor applied to the rate when latency is over the target.
+            window (float): Seconds between rate adjustments.
+        """
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.burst = burst if burst is not None else max(1.0, rate / 10.0)
+        self.min_rate = min_rate if min_rate is not None else max(1.0, rate * 0.05)
+        self.latency_target = latency_target
+        self.latency_factor = latency_factor
+        self.backoff = backoff
+        self.window = window
+        self.tokens = self.burst
+        self.admitted = 0
+        self.throttled = 0
+        self.throttle_time = 0.0
+        self.adjustments = 0
+        self.best_latency = None
+        self.last_latency = None
+        self.started = time.monotonic()
+        self._last_refill = self.started
+        self._window_start = self.started
+        self._window_latency = 0.0
+        self._window_samples = 0
+        self._lock = threading.Lock()
+
+    def acquire(self, n=1):
+        """Takes n tokens, sleeping until they are available."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+            self.tokens -= n
+            self.admitted += n
+            # A negative balance is a reservation: wait until it has been paid back
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            if wait:
+                self.throttled += 1
+                self.throttle_time += wait
+        if wait:
+            time.sleep(wait)
+
+    def observe(self, latency):
+        """Records the duration of one stat call and adapts the rate once per window."""
+        with self._lock:
+            self._window_latency += latency
+            self._window_samples += 1
+            now = time.monotonic()
+            if now - self._window_start < self.window or self._window_samples < 10:
+                return
+            mean = self._window_latency / self._window_samples
+            self._window_start = now
+            self._window_latency = 0.0
+            self._window_samples = 0
+            self.last_latency = mean
+            if self.best_latency is None or mean < self.best_latency:
+                self.best_latency = mean
+            target = self.latency_target if self.latency_target is not None else \
+                self.best_latency * self.latency_factor
+            if mean > target:
+                rate = max(self.min_rate, self.rate * self.backoff)
+            elif mean < target / 2:
+                rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+            else:
+                rate = self.rate
+            if rate != self.rate:
+                self.rate = rate
+                self.adjustments += 1
+
+    def timed_stat(self, entry, follow_symlinks=False):
+        """entry.stat() under the budget, feeding its latency back into the rate."""
+        self.acquire()
+        start = time.perf_counter()
+        try:
+            return entry.stat(follow_symlinks=follow_symlinks)
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def stats(self):
+        elapsed = time.monotonic() - self.started
+        return {
+            'ops': self.admitted,
+            'ops_per_sec': self.admitted / elapsed if elapsed else 0.0,
+            'rate_limit': self.rate,
+            'max_rate': self.max_rate,
+            'throttled': self.throttled,
+            'throttle_time': self.throttle_time,
+            'stat_latency': self.last_latency or 0.0,
+            'adjustments': self.adjustments,
+        }
+
+    def add_metrics(self, encoder, tags, timestamp):
+        """Adds the current throughput, budget and throttle time as a filesystem_scan_self point."""
+        s = self.stats()
+        encoder.add("filesystem_scan_self", tags, {
+            'ops': s['ops'],
+            'ops_per_sec': round(s['ops_per_sec'], 1),
+            'rate_limit': round(s['rate_limit'], 1),
+            'throttle_seconds': round(s['throttle_time'], 3),
+            'stat_latency_us': round(s['stat_latency'] * 1e6, 1),
+            'adjustments': s['adjustments'],
+        }, timestamp)
+
+    def format_report(self):
+        s = self.stats()
+        return (f"rate limiter: {s['ops']} ops at {s['ops_per_sec']:.0f}/s (limit now {s['rate_limit']:.0f}/s "
+                f"of {s['max_rate']:.0f}/s, {s['adjustments']} adjustments), throttled {s['throttled']} times "
+                f"for {s['throttle_time']:.2f}s, last stat latency {s['stat_latency'] * 1e6:.0f} us")
@@ -0,0 +1,97 @@
+import stat
+import time
+
+from lfs_schema import dir_level_tags, dir_prefix, normalize_extension
+
+DAY = 86400
+
+# (upper bound in days, bucket label); anything older falls into the last label
+AGE_BUCKETS = (
+    (1, "0-1d"),
+    (7, "1-7d"),
+    (30, "7-30d"),
+    (90, "30-90d"),
+    (365, "90d-1y"),
+    (3 * 365, "1-3y"),
+)
+OLDEST_BUCKET = "3y+"
+
+
+def age_bucket(seconds_ago):
+    days = seconds_ago / DAY
+    for limit, label in AGE_BUCKETS:
+        if days < limit:
+            return label
+    return OLDEST_BUCKET
+
+
+class RollupAccumulator:
+    """
+    Sums file sizes and counts per directory, owner, group, extension and age bucket during a scan.
+
+    Everything InfluxDB would otherwise compute with regex GROUP BY queries or
+    continuous queries over the raw points is accumulated in a few dicts here,
+    and written at the end as filesystem_rollup points, one per group. The
+    `by` tag names the dimension (directory, owner, group, extension, age), so
+    a panel reads e.g. `WHERE "by" = 'owner' GROUP BY "user"`.
+
+    Directories are rolled up into their ancestor at depth rollup_depth (files
+    higher up count towards their own directory), which bounds the number of
+    directory points no matter how deep the tree is. With dir_levels set, the
+    directory points also carry the dir_l1 .. dir_lN tags.
+    """
+
+    def __init__(self, rollup_depth=3, now=None, dir_levels=0):
+        self.rollup_depth = rollup_depth
+        self.dir_levels = dir_levels
+        self.now = now if now is not None else time.time()
+        self.groups = {
+            'directory': {},
+            'owner': {},
+            'group': {},
+            'extension': {},
+            'age': {},
+        }
+
+    @staticmethod
+    def _bump(table, key, size):
+        totals = table.get(key)
+        if totals is None:
+            table[key] = [size, 1]
+        else:
+            totals[0] += size
+            totals[1] += 1
+
+    def add(self, rec):
+        """Adds one StatRecord; only regular files are counted."""
+        if not stat.S_ISREG(rec.st.st_mode):
+            return
+        size = rec.size
+        groups = self.groups
+        self._bump(groups['directory'], dir_prefix(rec.path, self.rollup_depth), size)
+        self._bump(groups['owner'], rec.user, size)
+        self._bump(groups['group'], rec.group, size)
+        self._bump(groups['extension'], normalize_extension(rec.extension), size)
+        self._bump(groups['age'], ('modified', age_bucket(self.now - rec.mtime)), size)
+        self._bump(groups['age'], ('accessed', age_bucket(self.now - rec.atime)), size)
+
+    def emit(self, encoder, timestamp):
+        """
+        Adds one filesystem_rollup point per group to the encoder.
+
+        Returns:
+            int: The number of points added.
+        """
+        tag_keys = {'directory': 'directory', 'owner': 'user', 'group': 'group', 'extension': 'extension'}
+        points = 0
+        for by, table in self.groups.items():
+            for key, (size, count) in table.items():
+                if by == 'age':
+                    tags = {'by': by, 'basis': key[0], 'bucket': key[1]}
+                else:
+                    tags = {'by': by, tag_keys[by]: key}
+                    if by == 'directory' and self.dir_levels:
+                        tags.update(dir_level_tags(key + '/', self.dir_levels))
+                encoder.add("filesystem_rollup", tags, {'size': size, 'file_count': count}, timestamp)
+                points += 1
+        return points
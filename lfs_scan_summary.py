@@ -0,0 +1,146 @@
+import heapq
+import stat
+import time
+
+from lfs_rollups import AGE_BUCKETS, OLDEST_BUCKET, age_bucket
+from lfs_schema import normalize_extension
+
+# Age histogram fields in age order, the same buckets as the filesystem_rollup age points
+AGE_FIELDS = tuple(label for _, label in AGE_BUCKETS) + (OLDEST_BUCKET,)
+
+
+def size_bucket(size):
+    """
+    Log2 size bucket: 0 for empty files, k for sizes in [2**(k-1), 2**k).
+
+    The field name of bucket k is its lower bound in bytes (b0, b1, b2, b4 ... b1073741824).
+    """
+    return size.bit_length()
+
+
+def size_bucket_field(bucket):
+    return f"b{1 << (bucket - 1) if bucket else 0}"
+
+
+class TopN:
+    """
+    The n largest entries seen so far, kept in a min-heap of n (size, path, info) tuples.
+
+    Paths are unique, so ties on size are broken by path and info is never compared.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.heap = []
+
+    def add(self, size, path, info=()):
+        heap = self.heap
+        if len(heap) < self.n:
+            heapq.heappush(heap, (size, path, info))
+        elif heap and size > heap[0][0]:
+            heapq.heapreplace(heap, (size, path, info))
+
+    def largest(self):
+        """The kept entries, largest first."""
+        return sorted(self.heap, reverse=True)
+
+
+class ScanSummary:
+    """
+    Bounded-memory sketches of a scan: the largest files, size histograms per
+    extension and age histograms by last modification and last access.
+
+    Each one is updated in O(1) (O(log n) for the top-n heap) as records stream
+    past, so questions like "largest 1000 files", "size distribution of *.log"
+    or "how much has not been read for a year" are answered from top_n plus a
+    few hundred filesystem_summary points written at the end of the scan,
+    instead of from every raw filesystem_stat point. Memory is bounded by
+    top_n, the number of extensions kept (max_extensions, the rest count as
+    "other") and the fixed bucket count of the histograms. Only regular files
+    are counted.
+
+    Points (all with tag summary=<kind>):
+        top_files    rank=1..N; fields path, size, user, mtime
+        size         extension=<ext> or "all"; fields files, bytes and one
+                     count per non-empty size bucket (b0, b1, b2, b4 ...)
+        age          basis=modified|accessed; fields files, bytes and one count
+                     per non-empty lfs_rollups age bucket (0-1d, 1-7d ... 3y+)
+    """
+
+    def __init__(self, top_n=1000, max_extensions=100, now=None):
+        self.top = TopN(top_n)
+        self.max_extensions = max_extensions
+        self.now = now if now is not None else time.time()
+        self.files = 0
+        self.bytes = 0
+        # extension -> [files, bytes, {bucket: count}]
+        self.sizes = {}
+        self.all_sizes = [0, 0, {}]
+        self.ages = {'modified': [0, 0, {}], 'accessed': [0, 0, {}]}
+
+    @staticmethod
+    def _bump(histogram, bucket, size):
+        histogram[0] += 1
+        histogram[1] += size
+        counts = histogram[2]
+        counts[bucket] = counts.get(bucket, 0) + 1
+
+    def add(self, rec):
+        """Adds one StatRecord."""
+        if not stat.S_ISREG(rec.st.st_mode):
+            return
+        size = rec.size
+        self.files += 1
+        self.bytes += size
+        self.top.add(size, rec.path, (rec.user, rec.mtime))
+        bucket = size_bucket(size)
+        self._bump(self.all_sizes, bucket, size)
+        extension = normalize_extension(rec.extension)
+        histogram = self.sizes.get(extension)
+        if histogram is None:
+            if len(self.sizes) >= self.max_extensions:
+                extension = "other"
+                histogram = self.sizes.setdefault(extension, [0, 0, {}])
+            else:
+                histogram = self.sizes[extension] = [0, 0, {}]
+        self._bump(histogram, bucket, size)
+        now = self.now
+        self._bump(self.ages['modified'], age_bucket(now - rec.mtime), size)
+        self._bump(self.ages['accessed'], age_bucket(now - rec.atime), size)
+
+    def emit(self, encoder, timestamp, tags=None):
+        """
+        Adds the filesystem_summary points to the encoder.
+
+        Args:
+            tags (dict): Extra tags for every point, e.g. {'path': root}.
+
+        Returns:
+            int: The number of points added.
+        """
+        tags = tags or {}
+        points = 0
+        for rank, (size, path, (user, mtime)) in enumerate(self.top.largest(), 1):
+            encoder.add("filesystem_summary", {**tags, 'summary': 'top_files', 'rank': rank},
+                        {'path': path, 'size': size, 'user': user, 'mtime': mtime}, timestamp)
+            points += 1
+        for extension, histogram in [('all', self.all_sizes)] + sorted(self.sizes.items()):
+            files, total, counts = histogram
+            fields = {'files': files, 'bytes': total}
+            fields.update((size_bucket_field(b), counts[b]) for b in sorted(counts))
+            encoder.add("filesystem_summary", {**tags, 'summary': 'size', 'extension': extension}, fields,
+                        timestamp)
+            points += 1
+        for basis, histogram in self.ages.items():
+            files, total, counts = histogram
+            fields = {'files': files, 'bytes': total}
+            fields.update((label, counts[label]) for label in AGE_FIELDS if label in counts)
+            encoder.add("filesystem_summary", {**tags, 'summary': 'age', 'basis': basis}, fields, timestamp)
+            points += 1
+        return points
+
+    def format_report(self, limit=10):
+        lines = [f"summary: {self.files} files, {self.bytes} bytes, {len(self.sizes)} extensions; largest:"]
+        for size, path, _ in self.top.largest()[:limit]:
+            lines.append(f"  {size:>16} {path}")
+        return "\n".join(lines)
@@ -0,0 +1,46 @@
+import os
+import stat
+
+
+def scandir_walk(directory, follow_symlinks=False, onerror=None, rules=None):
+    """
+    Walks a directory tree with os.scandir and yields (path, stat_result) for every file.
+
+    Unlike walk_directory + get_file_info in lfs_fileinfo.py, the stat data comes
+    from the DirEntry itself, so each file costs a single (l)stat and no extra
+    path join or is_dir probe. Directories are walked depth first with an explicit
+    stack, so very deep trees cannot hit the recursion limit.
+
+    Args:
+        directory (str): The directory to start the walk from.
+        follow_symlinks (bool): Stat the symlink target instead of the link itself.
+        onerror (callable): Called with the OSError when a directory or entry cannot be read.
+        rules (WalkRules): Exclusions are checked on the name before an entry is
+            stat'ed, so excluded subtrees are never read.
+
+    Yields:
+        tuple: (path, os.stat_result) for each non-directory entry.
+    """
+    device = rules.root_device(directory) if rules is not None else None
+    stack = [(directory, 0)]
+    while stack:
+        current, depth = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if rules is not None and rules.excluded(entry.path, entry.name):
+                        continue
+                    try:
+                        st = entry.stat(follow_symlinks=follow_symlinks)
+                    except OSError as e:
+                        if onerror is not None:
+                            onerror(e)
+                        continue
+                    if stat.S_ISDIR(st.st_mode):
+                        if rules is None or rules.descend(depth + 1, st, device):
+                            stack.append((entry.path, depth + 1))
+                    elif rules is None or rules.report(entry.path, entry.name, depth + 1):
+                        yield entry.path, st
+        except OSError as e:
+            if onerror is not None:
+                onerror(e)
@@ -0,0 +1,133 @@
+import hashlib
+import math
+import re
+
+# default: the collector's typed output (path and times as fields, normalised filetype)
+# bounded: only bounded dimensions as tags, everything per-file as fields
+# compat:  the filestat_master.sh tag set (file, modified_time, accessed_time as tags)
+SCHEMAS = ('default', 'bounded', 'compat')
+
+_EXTENSION_RE = re.compile(r'^[a-z0-9_]{1,8}$')
+
+
+def normalize_extension(extension):
+    """
+    Maps an extension onto a bounded tag value.
+
+    Lower-cased, at most 8 characters of [a-z0-9_]; anything else (random
+    suffixes, version strings, backup names) collapses to "other".
+    """
+    if not extension:
+        return "none"
+    extension = extension.lower()
+    return extension if _EXTENSION_RE.match(extension) else "other"
+
+
+def dir_prefix(path, depth):
+    """Returns the first depth components of the entry's parent directory, e.g. /mnt/c/Program Files."""
+    parent = path.rsplit('/', 1)[0] or '/'
+    parts = parent.split('/')
+    # parts[0] is '' for absolute paths
+    return '/'.join(parts[:depth + 1]) or '/'
+
+
+def dir_level_tags(path, levels):
+    """
+    Splits the entry's parent directory into dir_l1 .. dir_lN component tags.
+
+    /mnt/c/Program Files/7-Zip/7z.exe with levels=3 gives dir_l1=mnt, dir_l2=c,
+    dir_l3=Program Files, so a subtree is selected with exact tag matches
+    instead of a regex over the full path. Shallower entries get fewer tags.
+    """
+    parts = path.rsplit('/', 1)[0].split('/')[1:levels + 1]
+    return {f'dir_l{i}': part for i, part in enumerate(parts, 1) if part}
+
+
+def point_for(rec, schema='default', prefix_depth=3, dir_levels=0):
+    """
+    Builds the (tags, fields) of a filesystem_stat point for a StatRecord.
+
+    Args:
+        rec (StatRecord): The collected entry.
+        schema (str): One of SCHEMAS.
+        prefix_depth (int): Path components kept in the dir_prefix tag of the bounded schema.
+        dir_levels (int): Add dir_l1 .. dir_lN tags (not for compat); 0 disables them.
+
+    Returns:
+        tuple: (tags dict, fields dict)
+    """
+    if schema == 'bounded':
+        tags = {'type': rec.type, 'user': rec.user, 'group': rec.group, 'depth': rec.depth,
+                'extension': normalize_extension(rec.extension), 'dir_prefix': dir_prefix(rec.path, prefix_depth)}
+        fields = {'size': rec.size, 'file': rec.path, 'permissions': rec.permissions,
+                  'writable': rec.writable, 'modified_time': rec.mtime, 'accessed_time': rec.atime}
+    elif schema == 'compat':
+        tags = {'type': rec.type, 'permissions': rec.permissions, 'user': rec.user, 'group': rec.group,
+                'file': rec.path, 'writable': 0, 'depth': rec.depth, 'filetype': rec.path.split('.')[-1],
+                'modified_time': rec.mtime, 'accessed_time': rec.atime}
+        fields = {'size': rec.size}
+    else:
+        tags = {'type': rec.type, 'permissions': rec.permissions, 'user': rec.user, 'group': rec.group,
+                'depth': rec.depth, 'filetype': normalize_extension(rec.extension), 'writable': int(rec.writable)}
+        fields = {'size': rec.size, 'file': rec.path, 'modified_time': rec.mtime, 'accessed_time': rec.atime}
+    if dir_levels and schema != 'compat':
+        tags.update(dir_level_tags(rec.path, dir_levels))
+    return tags, fields
+
+
+def file_info_point(path, size, owner, group, permissions, schema='bounded', prefix_depth=3):
+    """
+    Builds the (tags, fields) of an lfs_fileinfo file_info point.
+
+    compat keeps the original layout with the path as a tag, i.e. one series
+    per file. Every other schema follows bounded: the path moves to a field and
+    the tags are owner, group, permissions, a normalised extension and the
+    dir_prefix of the first prefix_depth path components.
+    """
+    if schema == 'compat':
+        return {'path': path, 'owner': owner, 'group': group, 'permissions': permissions}, {'size': size}
+    base = path.rsplit('/', 1)[-1]
+    extension = base.rsplit('.', 1)[-1] if '.' in base[1:] else ''
+    tags = {'owner': owner, 'group': group, 'permissions': permissions,
+            'extension': normalize_extension(extension), 'dir_prefix': dir_prefix(path, prefix_depth)}
+    return tags, {'size': size, 'path': path}
+
+
+class SeriesEstimator:
+    """
+    Estimates how many distinct series a scan would create, in fixed memory.
+
+    A series is the measurement plus its sorted tag set. Keys are counted with a
+    HyperLogLog sketch (2**precision one-byte registers, about 1% error at the
+    default precision), so estimating a scan of tens of millions of files does
+    not need a set of every key.
+    """
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+        self.points = 0
+
+    def add(self, measurement, tags):
+        key = measurement + ''.join(f',{k}={tags[k]}' for k in sorted(tags))
+        self.add_key(key)
+
+    def add_key(self, key):
+        self.points += 1
+        h = int.from_bytes(hashlib.blake2b(key.encode('utf-8', 'surrogateescape'), digest_size=8).digest(), 'big')
+        p = self.precision
+        index = h >> (64 - p)
+        rest = h & ((1 << (64 - p)) - 1)
+        rank = (64 - p) - rest.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if raw <= 2.5 * m and zeros:
+            # Linear counting is more accurate while most registers are still empty
+            return int(round(m * math.log(m / zeros)))
+        return int(round(raw))
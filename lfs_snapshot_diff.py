@@ -0,0 +1,268 @@
+import argparse
+import sys
+import time
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from lfs_columnar import read_snapshot
+from lfs_lineproto import LineProtocolEncoder
+
+DIFF_COLUMNS = ['path', 'size', 'dev', 'ino']
+
+
+def inode_keys(old, new):
+    """
+    Packs (dev, ino) of both snapshots into single uint64 keys.
+
+    Devices are renumbered 0..n-1 over both snapshots and stored above the
+    bits the largest inode needs, so the keys sort and compare like the pairs.
+    """
+    old_dev = old.column('dev').to_numpy()
+    new_dev = new.column('dev').to_numpy()
+    old_ino = old.column('ino').to_numpy()
+    new_ino = new.column('ino').to_numpy()
+    devices, dev_index = np.unique(np.concatenate([old_dev, new_dev]), return_inverse=True)
+    max_ino = max(int(old_ino.max(initial=0)), int(new_ino.max(initial=0)))
+    shift = max(max_ino.bit_length(), 1)
+    if shift + max(len(devices) - 1, 1).bit_length() > 64:
+        raise ValueError("inode numbers too large to pack with the device; use key='path'")
+    keys = (dev_index.astype(np.uint64) << np.uint64(shift))
+    keys[:len(old_dev)] |= old_ino
+    keys[len(old_dev):] |= new_ino
+    return keys[:len(old_dev)], keys[len(old_dev):]
+
+
+def match_sorted(old_keys, new_keys):
+    """
+    Joins two key arrays with a sort-merge.
+
+    Both sides are sorted first; searching the sorted new keys in the sorted
+    old keys then walks both arrays in order, which keeps the search cache
+    friendly (random-order lookups are several times slower at 10M rows).
+
+    Returns:
+        tuple: (old_index, new_index) of matched rows, and bool masks of the
+            old rows without a match (deleted) and the new rows without one (created).
+    """
+    old_order = np.argsort(old_keys)
+    new_order = np.argsort(new_keys)
+    old_sorted = old_keys[old_order]
+    new_sorted = new_keys[new_order]
+    pos = np.searchsorted(old_sorted, new_sorted)
+    found_sorted = pos < len(old_sorted)
+    found_sorted[found_sorted] = old_sorted[pos[found_sorted]] == new_sorted[found_sorted]
+    new_index = new_order[found_sorted]
+    old_index = old_order[pos[found_sorted]]
+    created = np.ones(len(new_keys), dtype=bool)
+    created[new_index] = False
+    deleted = np.ones(len(old_keys), dtype=bool)
+    deleted[old_index] = False
+    return old_index, new_index, deleted, created
+
+
+def match_paths(old_paths, new_paths):
+    """
+    Joins two path columns (paths are unique within a snapshot).
+
+    Returns:
+        tuple: (old_index, new_index) of the matched rows.
+    """
+    new_in_old = pc.index_in(new_paths, value_set=old_paths.combine_chunks()).to_numpy(zero_copy_only=False)
+    found = ~np.isnan(new_in_old) if new_in_old.dtype.kind == 'f' else new_in_old >= 0
+    return new_in_old[found].astype(np.int64), np.flatnonzero(found)
+
+
+def duplicated(keys):
+    """The distinct values that occur more than once in keys."""
+    ordered = np.sort(keys)
+    return np.unique(ordered[1:][ordered[1:] == ordered[:-1]])
+
+
+def directory_of(paths, depth):
+    """Maps every path to its ancestor directory at the given depth (/mnt/c/Program Files is depth 3)."""
+    return pc.struct_field(pc.extract_regex(paths, r'^(?P<dir>(?:/[^/]*){0,%d})/' % depth), 'dir')
+
+
+class SnapshotDiff:
+    """
+    Compares two columnar snapshots (see lfs_columnar) entry by entry and per directory.
+
+    Entries are joined on (dev, ino) by default, or on the path with
+    key='path'. As in lfs_incremental, an inode that now has a different path
+    is a deletion plus a creation, and hard links follow its keying rule: a
+    key that is not unique in either snapshot is joined on (dev, ino, path).
+    Matched entries whose size went up or down are grown or shrunk; everything
+    is done on whole columns, so tens of millions of rows take seconds rather
+    than a Python loop per entry.
+    """
+
+    def __init__(self, old, new, key='inode', depth=3):
+        self.old = old
+        self.new = new
+        self.depth = depth
+        if key == 'path':
+            self.old_index, self.new_index = match_paths(old.column('path'), new.column('path'))
+        else:
+            self.old_index, self.new_index = self._match_inodes(old, new)
+        self.deleted = np.ones(len(old), dtype=bool)
+        self.deleted[self.old_index] = False
+        self.created = np.ones(len(new), dtype=bool)
+        self.created[self.new_index] = False
+
+        old_size = old.column('size').to_numpy()
+        new_size = new.column('size').to_numpy()
+        self.delta = new_size[self.new_index] - old_size[self.old_index]
+        self.grown = self.delta > 0
+        self.shrunk = self.delta < 0
+
+    @staticmethod
+    def _match_inodes(old, new):
+        """Returns (old_index, new_index) of the rows that are the same entry by inode."""
+        old_keys, new_keys = inode_keys(old, new)
+        linked = np.union1d(duplicated(old_keys), duplicated(new_keys))
+        if len(linked):
+            old_linked = np.isin(old_keys, linked)
+            new_linked = np.isin(new_keys, linked)
+            old_rows = np.flatnonzero(~old_linked)
+            new_rows = np.flatnonzero(~new_linked)
+        else:
+            old_rows = np.arange(len(old_keys))
+            new_rows = np.arange(len(new_keys))
+        old_index, new_index, _, _ = match_sorted(old_keys[old_rows], new_keys[new_rows])
+        old_index = old_rows[old_index]
+        new_index = new_rows[new_index]
+        # Same inode, different path: treat like lfs_incremental does
+        same = pc.equal(old.column('path').take(old_index),
+                        new.column('path').take(new_index)).to_numpy(zero_copy_only=False)
+        old_index = old_index[same]
+        new_index = new_index[same]
+        if len(linked):
+            # Hard links: only the same name of the same inode is the same entry
+            old_rows = np.flatnonzero(old_linked)
+            new_rows = np.flatnonzero(new_linked)
+            link_old, link_new = match_paths(old.column('path').take(old_rows), new.column('path').take(new_rows))
+            link_old = old_rows[link_old]
+            link_new = new_rows[link_new]
+            same = old_keys[link_old] == new_keys[link_new]
+            old_index = np.concatenate([old_index, link_old[same]])
+            new_index = np.concatenate([new_index, link_new[same]])
+        return old_index, new_index
+
+    def counts(self):
+        return {'created': int(self.created.sum()), 'deleted': int(self.deleted.sum()),
+                'grown': int(self.grown.sum()), 'shrunk': int(self.shrunk.sum()),
+                'unchanged': int((self.delta == 0).sum())}
+
+    def directory_deltas(self):
+        """
+        Per-directory size and file count change, rolled up to self.depth.
+
+        Only changed entries are grouped (created, deleted and resized ones), so
+        the cost follows the churn, not the size of the snapshots.
+
+        Returns:
+            list: (directory, size_delta, file_count_delta), largest growth first.
+        """
+        old_size = self.old.column('size').to_numpy()
+        new_size = self.new.column('size').to_numpy()
+        created = np.flatnonzero(self.created)
+        deleted = np.flatnonzero(self.deleted)
+        resized = self.delta != 0
+        paths = pa.chunked_array(self.new.column('path').take(created).chunks
+                                 + self.old.column('path').take(deleted).chunks
+                                 + self.new.column('path').take(self.new_index[resized]).chunks,
+                                 type=pa.string())
+        changes = pa.table({
+            'dir': directory_of(paths, self.depth),
+            'delta': np.concatenate([new_size[created], -old_size[deleted], self.delta[resized]]),
+            'count': np.concatenate([np.ones(len(created), dtype=np.int64), -np.ones(len(deleted), dtype=np.int64),
+                                     np.zeros(int(resized.sum()), dtype=np.int64)]),
+        })
+        grouped = changes.group_by('dir').aggregate([('delta', 'sum'), ('count', 'sum')])
+        rows = [(d or '/', delta, count) for d, delta, count in zip(grouped.column('dir').to_pylist(),
+                                                                     grouped.column('delta_sum').to_pylist(),
+                                                                     grouped.column('count_sum').to_pylist())
+                if delta or count]
+        rows.sort(key=lambda row: -row[1])
+        return rows
+
+    def entries(self, min_delta=0):
+        """
+        Yields (change, path, size, previous_size) for every changed entry with |delta| >= min_delta.
+
+        Created entries count their full size as the delta, deleted ones minus theirs.
+        """
+        old_path, new_path = self.old.column('path'), self.new.column('path')
+        old_size = self.old.column('size').to_numpy()
+        new_size = self.new.column('size').to_numpy()
+
+        index = np.flatnonzero(self.created & (new_size >= min_delta))
+        for path, size in zip(new_path.take(index).to_pylist(), new_size[index].tolist()):
+            yield 'created', path, size, 0
+        index = np.flatnonzero(self.deleted & (old_size >= min_delta))
+        for path, size in zip(old_path.take(index).to_pylist(), old_size[index].tolist()):
+            yield 'deleted', path, 0, size
+        for change, mask in (('grown', self.grown), ('shrunk', self.shrunk)):
+            pick = np.flatnonzero(mask & (np.abs(self.delta) >= min_delta))
+            paths = new_path.take(self.new_index[pick]).to_pylist()
+            for path, size, previous in zip(paths, new_size[self.new_index[pick]].tolist(),
+                                            old_size[self.old_index[pick]].tolist()):
+                yield change, path, size, previous
+
+    def emit(self, encoder, timestamp, min_delta=0, entries=True, out=None):
+        """
+        Adds filesystem_delta points: one per changed directory (change=directory)
+        and, with entries, one per changed entry. With out, the encoder is
+        written there every 5000 lines instead of holding every point.
+
+        Returns:
+            int: The number of points added.
+        """
+        points = 0
+        for directory, delta, count_delta in self.directory_deltas():
+            if abs(delta) < min_delta:
+                continue
+            encoder.add("filesystem_delta", {'change': 'directory', 'directory': directory},
+                        {'delta': delta, 'file_count_delta': count_delta}, timestamp)
+            points += 1
+        if entries:
+            for change, path, size, previous in self.entries(min_delta):
+                encoder.add("filesystem_delta", {'change': change},
+                            {'path': path, 'size': size, 'previous_size': previous, 'delta': size - previous},
+                            timestamp)
+                points += 1
+                if out is not None and len(encoder) >= 5000:
+                    encoder.write_to(out)
+        return points
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Diff two columnar scan snapshots into filesystem_delta points")
+    parser.add_argument("old", help="Earlier snapshot (.arrow or .parquet, see lfs_columnar)")
+    parser.add_argument("new", help="Later snapshot")
+    parser.add_argument("--key", choices=['inode', 'path'], default='inode', help="Join on (dev, ino) or on the path")
+    parser.add_argument("--depth", type=int, default=3, help="Directory depth of the per-directory deltas")
+    parser.add_argument("--min-delta", type=int, default=0,
+                        help="Only report entries and directories whose size changed by at least this many bytes")
+    parser.add_argument("--directories-only", action="store_true", help="Skip the per-entry points")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    old = read_snapshot(args.old, columns=DIFF_COLUMNS)
+    new = read_snapshot(args.new, columns=DIFF_COLUMNS)
+    diff = SnapshotDiff(old, new, key=args.key, depth=args.depth)
+    joined = time.perf_counter() - start
+
+    encoder = LineProtocolEncoder()
+    points = diff.emit(encoder, time.time_ns(), args.min_delta, entries=not args.directories_only,
+                       out=sys.stdout)
+    encoder.write_to(sys.stdout)
+    counts = diff.counts()
+    print(f"{len(old)} -> {len(new)} entries joined in {joined:.2f}s: "
+          + ", ".join(f"{v} {k}" for k, v in counts.items()) + f"; {points} points", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+import argparse
+import os
+import re
+import stat
+import sys
+import time
+
+from lfs_incremental import run_incremental
+from lfs_influx_writer import InfluxWriter
+from lfs_lineproto import LineProtocolEncoder
+from lfs_mode_bits import is_writable
+from lfs_owner_cache import OwnerResolver, unknown_name
+from lfs_rate_limit import TokenBucket
+from lfs_rollups import RollupAccumulator
+from lfs_scan_summary import ScanSummary
+from lfs_schema import SCHEMAS, SeriesEstimator, point_for
+from lfs_walk_rules import add_rule_arguments, rules_from_args
+
+# Names printed by `stat -c %F`
+FILE_TYPES = (
+    (stat.S_ISDIR, "directory"),
+    (stat.S_ISLNK, "symbolic link"),
+    (stat.S_ISFIFO, "fifo"),
+    (stat.S_ISSOCK, "socket"),
+    (stat.S_ISCHR, "character special file"),
+    (stat.S_ISBLK, "block special file"),
+)
+
+
+def file_type_name(st):
+    if stat.S_ISREG(st.st_mode):
+        return "regular file" if st.st_size else "regular empty file"
+    for check, name in FILE_TYPES:
+        if check(st.st_mode):
+            return name
+    return "weird file"
+
+
+def octal_permissions(st):
+    """Permission bits the way `stat -c %a` prints them (e.g. 755, 1777)."""
+    return format(stat.S_IMODE(st.st_mode), 'o')
+
+
+def walk_preorder(root, onerror=None, limiter=None, rules=None):
+    """
+    Yields (path, lstat_result) for root and everything below it in `find` order.
+
+    Each directory is read completely, then its entries are visited in readdir
+    order and subdirectories are descended into as they are reached, which is
+    the order `find` prints them in. With a limiter (lfs_rate_limit.TokenBucket)
+    every directory read and stat is taken from its budget. With rules
+    (lfs_walk_rules.WalkRules) excluded entries are dropped before they are
+    stat'ed and excluded directories are never read.
+    """
+    try:
+        st = os.lstat(root)
+    except OSError as e:
+        if onerror is not None:
+            onerror(e)
+        return
+    yield root, st
+    device = rules.root_device(root) if rules is not None else None
+    if not stat.S_ISDIR(st.st_mode) or (rules is not None and not rules.descend(0, st, device)):
+        return
+
+    stack = []
+    try:
+        with os.scandir(root) as it:
+            stack.append(iter(list(it)))
+    except OSError as e:
+        if onerror is not None:
+            onerror(e)
+    while stack:
+        entry = next(stack[-1], None)
+        if entry is None:
+            stack.pop()
+            continue
+        depth = len(stack)
+        if rules is not None and rules.excluded(entry.path, entry.name):
+            continue
+        try:
+            st = entry.stat(follow_symlinks=False) if limiter is None else limiter.timed_stat(entry)
+        except OSError as e:
+            if onerror is not None:
+                onerror(e)
+            continue
+        if stat.S_ISDIR(st.st_mode):
+            yield entry.path, st
+            if rules is not None and not rules.descend(depth, st, device):
+                continue
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                with os.scandir(entry.path) as it:
+                    stack.append(iter(list(it)))
+            except OSError as e:
+                if onerror is not None:
+                    onerror(e)
+        elif rules is None or rules.report(entry.path, entry.name, depth):
+            yield entry.path, st
+
+
+class StatRecord:
+    """The fields filestat_master.sh derives from `stat -c "%s:%n:%a:%U:%G:%Y:%X:%F"` plus test -w."""
+
+    __slots__ = ('path', 'size', 'permissions', 'user', 'group', 'mtime', 'atime',
+                 'type', 'depth', 'extension', 'writable', 'st')
+
+    def __init__(self, path, st, resolver, uid, gids):
+        self.path = path
+        self.st = st
+        self.size = st.st_size
+        self.permissions = octal_permissions(st)
+        self.user = resolver.user(st.st_uid)
+        self.group = resolver.group(st.st_gid)
+        self.mtime = int(st.st_mtime)
+        self.atime = int(st.st_atime)
+        self.type = file_type_name(st)
+        self.depth = path.count('/')
+        base = path.rsplit('/', 1)[-1]
+        self.extension = base.rsplit('.', 1)[-1] if '.' in base[1:] else ''
+        self.writable = is_writable(st, uid, gids)
+
+
+def collect(root, resolver=None, onerror=None, limiter=None, rules=None):
+    """
+    Collects a StatRecord for root and every entry below it without spawning a process.
+
+    Args:
+        root (str): Directory (or file) to scan.
+        resolver (OwnerResolver): Name cache for owners and groups.
+        onerror (callable): Called with the OSError for entries that cannot be read.
+        limiter (TokenBucket): Optional I/O budget for the walk.
+        rules (WalkRules): Optional include/exclude rules, applied before descending.
+
+    Yields:
+        StatRecord: One record per entry, in `find` order.
+    """
+    resolver = resolver or OwnerResolver()
+    uid = os.geteuid()
+    gids = set(os.getgroups()) | {os.getegid()}
+    for path, st in walk_preorder(root, onerror, limiter, rules):
+        yield StatRecord(path, st, resolver, uid, gids)
+
+
+def _escape_compat_file(path):
+    return path.replace('"', '\\"').replace(' ', '\\ ').replace(',', '\\,').replace('=', '\\=')
+
+
+def format_compat(rec, timestamp):
+    """
+    Formats a record exactly like the awk program in filestat_master.sh.
+
+    That includes its quirks: tag values are quoted, `filetype` is whatever
+    follows the last "." anywhere in the path (the whole path when there is none)
+    and `writable` is always "0", because the script tests "$1" which xargs -I{}
+    never sets.
+    """
+    perm = rec.permissions
+    filetype = rec.path.split('.')[-1]
+    return (f'filesystem_stat,type="{rec.type.replace(" ", chr(92) + " ")}",permissions="{perm}",'
+            f'userpermission="{perm[0:1]}",grouppermission="{perm[1:2]}",otherpermission="{perm[2:3]}",'
+            f'user="{rec.user}",group="{rec.group}",file="{_escape_compat_file(rec.path)}",writable="0",'
+            f'depth="{rec.depth}",filetype="{filetype}",modified_time="{rec.mtime}",accessed_time="{rec.atime}" '
+            f'size={rec.size} {timestamp}\n')
+
+
+def add_record(encoder, rec, timestamp, schema='default', prefix_depth=3, dir_levels=0):
+    """Adds a record to a LineProtocolEncoder as a filesystem_stat point in the given schema."""
+    tags, fields = point_for(rec, schema, prefix_depth, dir_levels)
+    encoder.add("filesystem_stat", tags, fields, timestamp)
+
+
+def estimate_series(records, schemas=SCHEMAS, prefix_depth=3, dir_levels=0):
+    """
+    Estimates the series count each schema would produce for the given records.
+
+    Returns:
+        tuple: (points, {schema: estimated series})
+    """
+    estimators = {schema: SeriesEstimator() for schema in schemas}
+    points = 0
+    for rec in records:
+        points += 1
+        for schema, estimator in estimators.items():
+            estimator.add("filesystem_stat", point_for(rec, schema, prefix_depth, dir_levels)[0])
+    return points, {schema: e.estimate() for schema, e in estimators.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fork-free filesystem_stat collector")
+    parser.add_argument("path", help="Directory to scan")
+    parser.add_argument("--compat", action="store_true",
+                        help="Match the filestat_master.sh output byte for byte")
+    parser.add_argument("-o", "--output", help="Write line protocol here instead of stdout")
+    parser.add_argument("--schema", choices=SCHEMAS[:2], default="default",
+                        help="bounded keeps only bounded dimensions as tags (type, user, group, depth, "
+                             "extension, dir_prefix) and moves per-file values to fields")
+    parser.add_argument("--prefix-depth", type=int, default=3,
+                        help="Path components in the dir_prefix tag of the bounded schema")
+    parser.add_argument("--dir-levels", type=int, default=0,
+                        help="Add dir_l1 .. dir_lN path component tags for exact-match queries")
+    parser.add_argument("--estimate-series", action="store_true",
+                        help="Scan and print the series count per schema without writing points")
+    parser.add_argument("--rollups", action="store_true",
+                        help="Also emit filesystem_rollup points per directory, owner, group, extension and age")
+    parser.add_argument("--rollups-only", action="store_true",
+                        help="Emit only the filesystem_rollup points, not one point per file")
+    parser.add_argument("--summary", action="store_true",
+                        help="Also emit filesystem_summary points: largest files, size histograms per extension "
+                             "and access/modification age histograms")
+    parser.add_argument("--top-n", type=int, default=1000, help="Largest files kept for --summary")
+    parser.add_argument("--rollup-depth", type=int, default=3,
+                        help="Directories deeper than this are rolled up into their ancestor at this depth")
+    parser.add_argument("--incremental", metavar="SNAPSHOT",
+                        help="Only emit entries created, modified or deleted since the scan saved in SNAPSHOT")
+    add_rule_arguments(parser)
+    parser.add_argument("--max-rate", type=float,
+                        help="Budget in directory reads + stats per second; lowered automatically when "
+                             "stat latency rises")
+    parser.add_argument("--latency-target", type=float,
+                        help="Stat latency (seconds) above which --max-rate backs off (default: 3x the best seen)")
+    parser.add_argument("--self-metrics-interval", type=float, default=10.0,
+                        help="Seconds between filesystem_scan_self points when --max-rate is set")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Scan with a self-sizing stat thread pool and encoding processes (not in find order)")
+    parser.add_argument("--checkpoint", metavar="FILE",
+                        help="Save progress to FILE (needs -o) and resume from it if it exists")
+    parser.add_argument("--checkpoint-interval", type=float, default=30.0, help="Seconds between checkpoints")
+    parser.add_argument("--url", help="POST to this InfluxDB URL instead of writing a file")
+    parser.add_argument("--db", default="exampleDB", help="Database for --url")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Lines per HTTP request")
+    parser.add_argument("--flush-interval", type=float, default=10.0, help="Max seconds between requests")
+    parser.add_argument("--spool-dir", help="Keep batches that could not be delivered here")
+    args = parser.parse_args()
+
+    def report(e):
+        print(f"{e.filename}: {e.strerror}", file=sys.stderr)
+
+    resolver = OwnerResolver(fallback=unknown_name) if args.compat else OwnerResolver()
+    try:
+        rules = rules_from_args(args)
+    except (ValueError, re.error) as e:
+        parser.error(str(e))
+    if rules is not None and (args.checkpoint or args.adaptive):
+        parser.error("--exclude/--include/--max-depth/--xdev cannot be combined with --checkpoint or --adaptive")
+    if args.compat and (args.rollups or args.rollups_only):
+        parser.error("--rollups/--rollups-only cannot be combined with --compat, whose output must stay "
+                     "byte-compatible with filestat_master.sh")
+    if args.adaptive and (args.compat or args.rollups or args.rollups_only):
+        parser.error("--adaptive writes filesystem_stat points only and cannot be combined with --compat, "
+                     "--rollups or --rollups-only")
+    if args.summary and (args.adaptive or args.incremental or args.compat):
+        parser.error("--summary cannot be combined with --adaptive, --incremental or --compat")
+    if args.top_n < 1:
+        parser.error("--top-n must be at least 1")
+    limiter = TokenBucket(args.max_rate, latency_target=args.latency_target) if args.max_rate else None
+    if args.checkpoint:
+        if not args.output or args.compat or args.url or args.rollups or args.rollups_only or args.incremental \
+                or args.summary:
+            parser.error("--checkpoint needs -o and cannot be combined with --compat, --url, rollups, "
+                         "--summary or --incremental")
+        # lfs_checkpoint builds on StatRecord from this module
+        from lfs_checkpoint import CheckpointedScan, format_summary
+        scan = CheckpointedScan(args.path, args.output, args.checkpoint, args.checkpoint_interval,
+                                args.schema, resolver, onerror=report, prefix_depth=args.prefix_depth,
+                                dir_levels=args.dir_levels, limiter=limiter)
+        print(format_summary(scan.run()), file=sys.stderr)
+        if limiter is not None:
+            print(limiter.format_report(), file=sys.stderr)
+        return
+    if args.estimate_series:
+        points, series = estimate_series(collect(args.path, resolver, onerror=report, rules=rules),
+                                         prefix_depth=args.prefix_depth, dir_levels=args.dir_levels)
+        print(f"{points} points")
+        for schema, count in series.items():
+            print(f"  {schema:<8} ~{count} series ({count / points if points else 0:.1%} of points)")
+        return
+    encoder = LineProtocolEncoder()
+    if args.url:
+        out = InfluxWriter(args.url, database=args.db, batch_size=args.batch_size,
+                           flush_interval=args.flush_interval, spool_dir=args.spool_dir)
+        if args.spool_dir:
+            out.replay_spool()
+    elif args.output:
+        out = open(args.output, "w", encoding="utf-8", errors="surrogateescape")
+    else:
+        out = sys.stdout
+    try:
+        if args.adaptive:
+            # lfs_concurrency builds on StatRecord from this module
+            from lfs_concurrency import HillClimbingController, adaptive_scan
+            controller = HillClimbingController()
+            summary = adaptive_scan(args.path, out, controller, schema=args.schema, onerror=report,
+                                    limiter=limiter, prefix_depth=args.prefix_depth, dir_levels=args.dir_levels)
+            print(f"{summary['entries']} entries in {summary['elapsed']:.2f}s, {summary['processes']} encoding "
+                  f"processes", file=sys.stderr)
+            print(controller.format_report(), file=sys.stderr)
+            if limiter is not None:
+                print(limiter.format_report(), file=sys.stderr)
+            return
+        if args.incremental:
+            counts = run_incremental(args.path, args.incremental, out, onerror=report, limiter=limiter)
+            print(f"{counts['created']} created, {counts['modified']} modified, {counts['deleted']} deleted; "
+                  f"{counts['dirs_skipped']} of {counts['dirs_listed'] + counts['dirs_skipped']} dirs "
+                  f"unchanged, {counts['errors']} errors ({counts['kept']} unreadable entries kept)", file=sys.stderr)
+            if limiter is not None:
+                print(limiter.format_report(), file=sys.stderr)
+            return
+        rollups = RollupAccumulator(args.rollup_depth, dir_levels=args.dir_levels) if args.rollups or args.rollups_only else None
+        sketches = ScanSummary(args.top_n) if args.summary else None
+        next_metrics = time.monotonic() + args.self_metrics_interval
+        for rec in collect(args.path, resolver, onerror=report, limiter=limiter, rules=rules):
+            if limiter is not None and not args.compat and time.monotonic() >= next_metrics:
+                limiter.add_metrics(encoder, {'path': args.path}, time.time_ns())
+                next_metrics = time.monotonic() + args.self_metrics_interval
+            if sketches is not None:
+                sketches.add(rec)
+            if rollups is not None:
+                rollups.add(rec)
+                if args.rollups_only:
+                    continue
+            # the shell pipeline stamps every line with its own `date +%s%N`
+            if args.compat:
+                out.write(format_compat(rec, time.time_ns()))
+                continue
+            add_record(encoder, rec, time.time_ns(), args.schema, args.prefix_depth, args.dir_levels)
+            if len(encoder) >= 5000:
+                encoder.write_to(out)
+        if rollups is not None:
+            points = rollups.emit(encoder, time.time_ns())
+            print(f"{points} rollup points", file=sys.stderr)
+        if sketches is not None:
+            points = sketches.emit(encoder, time.time_ns(), {'path': args.path})
+            print(f"{points} summary points", file=sys.stderr)
+        if limiter is not None and not args.compat:
+            limiter.add_metrics(encoder, {'path': args.path}, time.time_ns())
+        encoder.write_to(out)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(resolver.format_report(), file=sys.stderr)
+    if limiter is not None:
+        print(limiter.format_report(), file=sys.stderr)
+    if rules is not None:
+        print(rules.format_report(), file=sys.stderr)
+    if sketches is not None:
+        print(sketches.format_report(), file=sys.stderr)
+    if args.url:
+        print(out.format_report(), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import fnmatch
+import glob
+import os
+import re
+
+
+def _pattern(rule, root=None):
+    """
+    Classifies a rule string as ('prefix', path), ('name', regex) or ('path', regex).
+
+    Relative paths and path globs are taken relative to root, the way the
+    walkers spell paths (root joined with the names below it); without a root
+    they raise ValueError, since they could never match.
+    """
+    if rule.startswith('re:'):
+        return 'path', rule[3:]
+    if rule.startswith('prefix:'):
+        kind, rule = 'prefix', rule[7:]
+    elif '/' not in rule:
+        # .git, venv, *.snapshot: matched against the entry's own name
+        return 'name', fnmatch.translate(rule)
+    else:
+        kind = 'path' if any(c in rule for c in '*?[') else 'prefix'
+    if not rule.startswith('/'):
+        if root is None:
+            raise ValueError(f"relative rule {rule!r} needs the walk root")
+        if kind == 'path':
+            rule = glob.escape(os.path.join(root, '')) + rule
+        else:
+            rule = os.path.join(root, rule)
+    return kind, (rule if kind == 'prefix' else fnmatch.translate(rule))
+
+
+class _RuleSet:
+    """One side (include or exclude) of the rules: a prefix trie plus two combined regexes."""
+
+    def __init__(self, rules, root=None):
+        self.trie = {}
+        names = []
+        paths = []
+        for rule in rules:
+            kind, value = _pattern(rule, root)
+            if kind == 'prefix':
+                node = self.trie
+                for part in value.rstrip('/').split('/'):
+                    node = node.setdefault(part, {})
+                node[None] = True
+            elif kind == 'name':
+                names.append(value)
+            else:
+                paths.append(value)
+        self.name_re = re.compile('|'.join(f'(?:{p})' for p in names)) if names else None
+        self.path_re = re.compile('|'.join(f'(?:{p})' for p in paths)) if paths else None
+        self.empty = not (self.trie or names or paths)
+
+    def _under_prefix(self, path):
+        node = self.trie
+        for part in path.split('/'):
+            node = node.get(part)
+            if node is None:
+                return False
+            if None in node:
+                return True
+        return False
+
+    def matches(self, path, name):
+        if self.name_re is not None and self.name_re.match(name):
+            return True
+        if self.trie and self._under_prefix(path):
+            return True
+        return self.path_re is not None and self.path_re.match(path) is not None
+
+
+class WalkRules:
+    """
+    Include/exclude rules compiled once and checked by the walkers before they descend.
+
+    A rule is a glob without "/" (matched against the entry name, e.g. .git,
+    venv, *.snapshot), a plain path (a prefix: that entry and everything below
+    it), a glob containing "/" (matched against the whole path), "prefix:PATH"
+    or "re:REGEX" (matched from the start of the path). Relative paths and
+    path globs are resolved against root, so they need one. Prefixes go into a trie
+    keyed by path component and the globs and regexes into one alternation per
+    kind, so a check costs one dict walk and at most two regex matches no matter
+    how many rules there are.
+
+    Excluded directories are never read. Include rules only filter which
+    non-directory entries are reported; directories are still descended into.
+    max_depth counts like find -maxdepth (the root is depth 0) and xdev keeps
+    the walk on the root's filesystem, like find -xdev.
+    """
+
+    def __init__(self, exclude=(), include=(), max_depth=None, xdev=False, root=None):
+        self.exclude = _RuleSet(exclude, root)
+        self.include = _RuleSet(include, root)
+        self.max_depth = max_depth
+        self.xdev = xdev
+        self.pruned = 0
+        self.skipped = 0
+
+    @property
+    def active(self):
+        return not (self.exclude.empty and self.include.empty and self.max_depth is None and not self.xdev)
+
+    def root_device(self, root):
+        """The device the walk of root must stay on, or None without xdev."""
+        if not self.xdev:
+            return None
+        try:
+            return os.stat(root).st_dev
+        except OSError:
+            return None
+
+    def excluded(self, path, name):
+        """True if the entry is excluded; called before it is stat'ed."""
+        if self.exclude.matches(path, name):
+            self.pruned += 1
+            return True
+        return False
+
+    def descend(self, depth, st, device):
+        """
+        Whether to read a directory found at depth (root = 0).
+
+        Args:
+            st (os.stat_result): The directory's lstat; only st_dev is used.
+            device (int): root_device() of the walk.
+        """
+        if self.max_depth is not None and depth >= self.max_depth:
+            return False
+        return device is None or st.st_dev == device
+
+    def report(self, path, name, depth):
+        """Whether a non-directory entry that was not excluded should be reported."""
+        if self.max_depth is not None and depth > self.max_depth:
+            return False
+        if not self.include.empty and not self.include.matches(path, name):
+            self.skipped += 1
+            return False
+        return True
+
+    def format_report(self):
+        return f"walk rules: {self.pruned} entries excluded before stat, {self.skipped} not included"
+
+
+def add_rule_arguments(parser):
+    """Adds --exclude/--include/--max-depth/--xdev to an argparse parser."""
+    parser.add_argument("--exclude", action="append", default=[], metavar="RULE",
+                        help="Skip entries matching RULE (name glob, path, path glob, prefix:PATH, re:REGEX); "
+                             "excluded directories are not read. Repeatable")
+    parser.add_argument("--include", action="append", default=[], metavar="RULE",
+                        help="Only report files matching one of these rules. Repeatable")
+    parser.add_argument("--max-depth", type=int, help="Do not descend below this depth (root = 0)")
+    parser.add_argument("--xdev", action="store_true", help="Stay on the root's filesystem")
+
+
+def rules_from_args(args):
+    """
+    Builds WalkRules from add_rule_arguments options, or None when no rule was given.
+
+    Relative rules are resolved against args.path, the walk root.
+    """
+    rules = WalkRules(args.exclude, args.include, args.max_depth, args.xdev, root=args.path)
+    return rules if rules.active else None
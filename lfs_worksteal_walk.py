@@ -0,0 +1,208 @@
+import collections
+import os
+import stat
+import threading
+import time
+
+
+class WorkerStats:
+    """Per-worker counters, only ever written by the worker that owns them."""
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.dirs = 0
+        self.files = 0
+        self.bytes = 0
+        self.steals = 0
+        self.errors = 0
+        self.busy = 0.0
+
+    def as_dict(self, wall_time):
+        return {
+            'worker': self.worker_id,
+            'dirs': self.dirs,
+            'files': self.files,
+            'bytes': self.bytes,
+            'steals': self.steals,
+            'errors': self.errors,
+            'busy': self.busy,
+            'utilization': self.busy / wall_time if wall_time else 0.0,
+        }
+
+
+class WorkStealingWalker:
+    """
+    Parallel directory traversal where every directory is its own task.
+
+    Each worker keeps a deque of pending directories. Subdirectories it finds are
+    pushed onto its own deque and popped LIFO, so a worker stays depth first in
+    its part of the tree. A worker whose deque runs dry steals the oldest entry
+    from another worker's deque, which is usually the largest untouched subtree.
+    One huge directory therefore spreads across all workers instead of pinning a
+    single process the way a Pool over a precomputed subdirectory list does.
+
+    Workers are threads: scandir and stat release the GIL, so the metadata I/O of
+    all workers overlaps, and the deques can be shared without pickling.
+    """
+
+    def __init__(self, num_workers=8, on_file=None, onerror=None, follow_symlinks=False, limiter=None,
+                 rules=None):
+        """
+        Args:
+            num_workers (int): Number of worker threads.
+            on_file (callable): Called as on_file(worker_id, path, stat_result) for every
+                non-directory entry. It runs on the worker thread, so keep state per worker_id.
+            onerror (callable): Called with the OSError when a directory or entry cannot be read.
+            follow_symlinks (bool): Stat symlink targets instead of the links themselves.
+            limiter (TokenBucket): Shared budget every scandir and stat is taken from.
+            rules (WalkRules): Include/exclude rules; excluded entries are dropped before they are stat'ed.
+        """
+        self.num_workers = num_workers
+        self.on_file = on_file
+        self.onerror = onerror
+        self.follow_symlinks = follow_symlinks
+        self.limiter = limiter
+        self.rules = rules
+        self._device = None
+        self.deques = [collections.deque() for _ in range(num_workers)]
+        self.stats = [WorkerStats(i) for i in range(num_workers)]
+        self.wall_time = 0.0
+        self._pending = 0
+        self._idle = 0
+        self._lock = threading.Lock()
+        self._work_available = threading.Condition(self._lock)
+
+    def _push(self, worker_id, path, depth=0):
+        with self._lock:
+            self._pending += 1
+            self.deques[worker_id].append((path, depth))
+            if self._idle:
+                self._work_available.notify()
+
+    def _task_done(self):
+        with self._lock:
+            self._pending -= 1
+            if self._pending == 0:
+                self._work_available.notify_all()
+
+    def _next_task(self, worker_id):
+        """Pops from the worker's own deque, otherwise steals from the others, otherwise waits."""
+        own = self.deques[worker_id]
+        while True:
+            try:
+                return own.pop()
+            except IndexError:
+                pass
+            for offset in range(1, self.num_workers):
+                victim = self.deques[(worker_id + offset) % self.num_workers]
+                try:
+                    task = victim.popleft()
+                except IndexError:
+                    continue
+                self.stats[worker_id].steals += 1
+                return task
+            with self._lock:
+                if self._pending == 0:
+                    return None
+                if any(self.deques):
+                    continue
+                self._idle += 1
+                self._work_available.wait(0.05)
+                self._idle -= 1
+
+    def _scan_directory(self, worker_id, directory, depth):
+        ws = self.stats[worker_id]
+        ws.dirs += 1
+        limiter = self.limiter
+        rules = self.rules
+        try:
+            if limiter is not None:
+                limiter.acquire()
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if rules is not None and rules.excluded(entry.path, entry.name):
+                        continue
+                    try:
+                        if limiter is not None:
+                            st = limiter.timed_stat(entry, self.follow_symlinks)
+                        else:
+                            st = entry.stat(follow_symlinks=self.follow_symlinks)
+                    except OSError as e:
+                        ws.errors += 1
+                        if self.onerror is not None:
+                            self.onerror(e)
+                        continue
+                    if stat.S_ISDIR(st.st_mode):
+                        if rules is None or rules.descend(depth + 1, st, self._device):
+                            self._push(worker_id, entry.path, depth + 1)
+                        continue
+                    if rules is not None and not rules.report(entry.path, entry.name, depth + 1):
+                        continue
+                    ws.files += 1
+                    ws.bytes += st.st_size
+                    if self.on_file is not None:
+                        self.on_file(worker_id, entry.path, st)
+        except OSError as e:
+            ws.errors += 1
+            if self.onerror is not None:
+                self.onerror(e)
+
+    def _worker(self, worker_id):
+        ws = self.stats[worker_id]
+        while True:
+            task = self._next_task(worker_id)
+            if task is None:
+                return
+            start = time.perf_counter()
+            try:
+                self._scan_directory(worker_id, *task)
+            finally:
+                ws.busy += time.perf_counter() - start
+                self._task_done()
+
+    def run(self, roots):
+        """
+        Walks every root and blocks until the whole tree has been visited.
+
+        Args:
+            roots (list): Directories to start from; they are dealt round robin to the workers.
+
+        Returns:
+            list: One WorkerStats per worker.
+        """
+        if isinstance(roots, str):
+            roots = [roots]
+        if self.rules is not None and roots:
+            self._device = self.rules.root_device(roots[0])
+        for i, root in enumerate(roots):
+            self._push(i % self.num_workers, root)
+
+        start = time.perf_counter()
+        threads = [threading.Thread(target=self._worker, args=(i,), daemon=True)
+                   for i in range(self.num_workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.wall_time = time.perf_counter() - start
+        return self.stats
+
+    def totals(self):
+        return {
+            'dirs': sum(ws.dirs for ws in self.stats),
+            'files': sum(ws.files for ws in self.stats),
+            'bytes': sum(ws.bytes for ws in self.stats),
+            'steals': sum(ws.steals for ws in self.stats),
+            'errors': sum(ws.errors for ws in self.stats),
+        }
+
+    def format_report(self):
+        lines = [f"{'worker':>6} {'dirs':>8} {'files':>10} {'bytes':>16} {'steals':>7} {'util':>6}"]
+        for ws in self.stats:
+            d = ws.as_dict(self.wall_time)
+            lines.append(f"{d['worker']:>6} {d['dirs']:>8} {d['files']:>10} {d['bytes']:>16} "
+                         f"{d['steals']:>7} {d['utilization']:>6.1%}")
+        t = self.totals()
+        lines.append(f"{'total':>6} {t['dirs']:>8} {t['files']:>10} {t['bytes']:>16} {t['steals']:>7} "
+                     f"in {self.wall_time:.2f}s")
+        return "\n".join(lines)
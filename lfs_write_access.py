@@ -0,0 +1,160 @@
+import argparse
+import array
+import os
+import pwd
+import stat
+import sys
+import time
+
+import numpy as np
+
+from lfs_lineproto import LineProtocolEncoder
+from lfs_mode_bits import permission_shift
+from lfs_scandir_walk import scandir_walk
+
+
+class UserIdentity:
+    """A user's uid plus every group it belongs to, resolved once per user."""
+
+    def __init__(self, name, uid, gids):
+        self.name = name
+        self.uid = uid
+        self.gids = np.array(sorted(gids), dtype=np.uint32)
+
+    @classmethod
+    def lookup(cls, user):
+        """
+        Resolves a user name or uid, including supplementary groups.
+
+        user_has_write_access only compared the file's gid with the user's login
+        group; os.getgrouplist also returns every group the user is a member of.
+        """
+        entry = pwd.getpwuid(int(user)) if str(user).isdigit() else pwd.getpwnam(user)
+        gids = os.getgrouplist(entry.pw_name, entry.pw_gid)
+        return cls(entry.pw_name, entry.pw_uid, gids)
+
+
+def scan_arrays(root, onerror=None):
+    """
+    Walks root once and returns its stat data as column arrays.
+
+    Symlinks are left out: their lstat mode is always 0o777, and whether the
+    target can be written is decided by the target's own entry.
+
+    Returns:
+        dict: paths (list) plus numpy arrays mode/uid/gid (uint32) and size (int64).
+    """
+    paths = []
+    mode = array.array('I')
+    uid = array.array('I')
+    gid = array.array('I')
+    size = array.array('q')
+    for path, st in scandir_walk(root, onerror=onerror):
+        if stat.S_ISLNK(st.st_mode):
+            continue
+        paths.append(path)
+        mode.append(st.st_mode)
+        uid.append(st.st_uid)
+        gid.append(st.st_gid)
+        size.append(st.st_size)
+    return {
+        'paths': paths,
+        'mode': np.frombuffer(mode, dtype=np.uint32),
+        'uid': np.frombuffer(uid, dtype=np.uint32),
+        'gid': np.frombuffer(gid, dtype=np.uint32),
+        'size': np.frombuffer(size, dtype=np.int64),
+    }
+
+
+def writable_mask(arrays, user):
+    """
+    Computes which entries the user may write, from mode/uid/gid alone.
+
+    The class of bits checked is chosen by lfs_mode_bits.permission_shift, as
+    for a single entry. root may write everything. ACLs and read-only mounts
+    are ignored.
+
+    Returns:
+        numpy.ndarray: bool array, one entry per scanned path.
+    """
+    mode = arrays['mode']
+    if user.uid == 0:
+        return np.ones(mode.shape, dtype=bool)
+    shift = permission_shift(arrays['uid'] == user.uid, np.isin(arrays['gid'], user.gids))
+    return (mode & (2 << shift)) != 0
+
+
+def writable_matrix(arrays, users):
+    """Returns a (len(users), entries) bool matrix, one row per user."""
+    matrix = np.empty((len(users), len(arrays['mode'])), dtype=bool)
+    for row, user in enumerate(users):
+        matrix[row] = writable_mask(arrays, user)
+    return matrix
+
+
+def exposure_report(arrays, users):
+    """
+    Summarises what each user can write.
+
+    Returns:
+        list: One dict per user with writable entries and bytes, and how many of
+            those are writable only through the "other" bits.
+    """
+    world = (arrays['mode'] & 0o002) != 0
+    report = []
+    for user in users:
+        mask = writable_mask(arrays, user)
+        report.append({
+            'user': user.name,
+            'writable_files': int(mask.sum()),
+            'writable_bytes': int(arrays['size'][mask].sum()),
+            'world_writable_files': int((mask & world).sum()),
+            'total_files': int(mask.size),
+        })
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-user write exposure from a single scan")
+    parser.add_argument("path", help="Directory to scan")
+    parser.add_argument("users", nargs="+", help="User names or uids to evaluate")
+    parser.add_argument("--list", metavar="USER", help="Print the paths this user can write")
+    args = parser.parse_args()
+
+    def report_error(e):
+        print(f"{e.filename}: {e.strerror}", file=sys.stderr)
+
+    users = []
+    for name in args.users:
+        try:
+            users.append(UserIdentity.lookup(name))
+        except KeyError:
+            parser.error(f"unknown user {name}")
+    start = time.perf_counter()
+    arrays = scan_arrays(args.path, onerror=report_error)
+    scanned = time.perf_counter() - start
+
+    if args.list:
+        user = next((u for u in users if args.list in (u.name, str(u.uid))), None)
+        if user is None:
+            parser.error(f"--list {args.list} is not one of the evaluated users")
+        for i in np.flatnonzero(writable_mask(arrays, user)):
+            print(arrays['paths'][i])
+        return
+
+    start = time.perf_counter()
+    report = exposure_report(arrays, users)
+    evaluated = time.perf_counter() - start
+
+    encoder = LineProtocolEncoder()
+    timestamp = time.time_ns()
+    for row in report:
+        encoder.add("filesystem_write_exposure", {'user': row['user'], 'path': args.path},
+                    {k: v for k, v in row.items() if k != 'user'}, timestamp)
+    encoder.write_to(sys.stdout)
+    print(f"{len(arrays['paths'])} entries scanned in {scanned:.2f}s, {len(users)} users evaluated in "
+          f"{evaluated * 1000:.1f} ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,11 @@
-import os
-import multiprocessing
-import stat
+from lfs_dir_rollup import iter_directory_totals
+from lfs_worksteal_walk import WorkStealingWalker
 
 def get_size(start_path='.'):
+    # One bottom-up pass; the old os.walk + recursive call counted each file once per ancestor
     total_size = 0
-    try:
-        for dirpath, dirnames, filenames in os.walk(start_path):
-            for file in filenames:
-                fp = os.path.join(dirpath, file)
-                try:
-                    file_size = os.path.getsize(fp)
-                    print(">>path:" + fp+ " >>filesize:" + str(file_size))
-                    total_size += file_size
-                except OSError as e:
-                    if e.errno == errno.EACCES:
-                        print(f"Permission denied for {fp}")
-                    else:
-                        raise
-            for dirname in dirnames:
-                # Handle subdirectories recursively
-                sub_path = os.path.join(dirpath, dirname)
-                try:
-                    sub_size = get_size(sub_path)
-                    total_size += sub_size
-                except OSError as e:
-                    if e.errno == errno.EACCES:
-                        print(f"Permission denied for {sub_path}")
-                    else:
-                        raise
-    except OSError as e:
-        if e.errno == errno.EACCES:
-            print(f"Permission denied for {start_path}")
-        else:
-            raise
+    for totals in iter_directory_totals(start_path, onerror=lambda e: print(f"Permission denied for {e.filename}")):
+        total_size = totals.size  # the root is yielded last
     return total_size
 
 def read_file_to_list(file_path):
@@ -49,14 +22,15 @@ def read_file_to_list(file_path):
 
 def main():
     #start_path = "/mnt/c/Program Files/"  # Replace with your desired path
-    folder_list = read_file_to_list('/home/anbu992003/subdirectories.txt')
+    folder_list = [line.rstrip('\n') for line in read_file_to_list('/home/anbu992003/subdirectories.txt')]
     print(folder_list)
-    # Parallelize the process (adjust the number of processes as needed)
-    with multiprocessing.Pool(processes=8) as pool:
-        #results = pool.map(get_size, [start_path])
-        results = pool.map(get_size, folder_list)
+    # Every directory is its own task and idle workers steal pending ones, so one
+    # huge subdirectory no longer pins a single worker (adjust num_workers as needed)
+    walker = WorkStealingWalker(num_workers=8)
+    walker.run(folder_list)
 
-    print(f"Total size: {results[0]} bytes")
+    print(walker.format_report())
+    print(f"Total size: {walker.totals()['bytes']} bytes")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
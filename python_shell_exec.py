@@ -1,24 +1,20 @@
-import subprocess
+from lfs_du import human_size, iter_child_usage
 
 def execute_and_process():
-    # Define the shell command
-    command = "find /path/to/directory -mindepth 1 -maxdepth 1 -type d -print0 | xargs -0 -n1 -P4 du -sh"
-    
-    # Execute the command using subprocess
-    process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-
-    # Process the output line by line
-    for line in process.stdout:
-        # Split the output (e.g., "4.0K    /path/to/directory/subdir")
-        size, directory = line.strip().split('\t')
-        
-        # Print or process the output as needed
-        print(f"Directory: {directory}, Size: {size}")
-    
+    # Size every immediate child directory (what `du -sh` reports per directory)
+    errors = 0
+    try:
+        for usage in iter_child_usage("/path/to/directory"):
+            # Print or process the output as needed
+            print(f"Directory: {usage['path']}, Size: {human_size(usage['allocated'])}")
+            errors += usage['errors']
+    except OSError as e:
+        print(f"Error reading directory: {e}")
+        return
+
     # Check for any errors
-    stderr = process.stderr.read()
-    if stderr:
-        print(f"Errors:\n{stderr}")
+    if errors:
+        print(f"Errors: {errors} entries could not be read")
 
 if __name__ == "__main__":
     execute_and_process()
@@ -32,11 +28,9 @@ if __name__ == "__main__":
 
 
 
-import subprocess
-
 def process_directory_sizes(directory_path):
   """
-  Executes the shell command and processes the output.
+  Computes the size of every immediate child directory.
 
   Args:
     directory_path: The path to the directory to process.
@@ -45,17 +39,13 @@ def process_directory_sizes(directory_path):
     A list of tuples, where each tuple contains the directory size and name.
   """
 
-  command = f"find {directory_path} -mindepth 1 -maxdepth 1 -type d -print0 | xargs -0 -n1 -P4 du -sh"
-  result = subprocess.run(command, shell=True, capture_output=True, text=True)
-
-  if result.returncode != 0:
-    print(f"Error executing command: {result.stderr}")
-    return []
-
   directory_sizes = []
-  for line in result.stdout.splitlines():
-    size, directory = line.split('\t')
-    directory_sizes.append((size, directory))
+  try:
+    for usage in iter_child_usage(directory_path):
+      directory_sizes.append((human_size(usage['allocated']), usage['path']))
+  except OSError as e:
+    print(f"Error reading directory: {e}")
+    return []
 
   return directory_sizes
 